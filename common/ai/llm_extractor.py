@@ -44,6 +44,10 @@ class LLMExtractor:
         self.max_retries = max_retries
         self.logger = logging.getLogger(__name__)
         
+        # Schema描述和列表包装模型缓存
+        self._schema_descriptions: Dict[Type[BaseModel], str] = {}
+        self._list_wrappers: Dict[Type[BaseModel], Type[BaseModel]] = {}
+        
         # 设置默认模型
         if model is None:
             self.model = "llama3.1:8b" if mode == "local" else "gpt-4o-mini"
@@ -73,7 +77,8 @@ class LLMExtractor:
         self,
         text: str,
         schema: Type[BaseModel],
-        instruction: Optional[str] = None
+        instruction: Optional[str] = None,
+        json_schema: Optional[Dict[str, Any]] = None
     ) -> Optional[BaseModel]:
         """
         从文本中提取结构化数据
@@ -82,12 +87,13 @@ class LLMExtractor:
             text: 要提取的文本内容
             schema: Pydantic模型类,定义提取的数据结构
             instruction: 额外的提取指令
+            json_schema: 预先计算的schema.model_json_schema()结果(可选)
         
         Returns:
             提取的结构化数据实例,失败返回None
         """
         # 构建提示词
-        schema_description = self._build_schema_description(schema)
+        schema_description = self._build_schema_description(schema, json_schema)
         
         system_prompt = f"""你是一个专业的数据提取助手。
 请从用户提供的文本中提取信息,并严格按照以下JSON Schema格式返回:
@@ -162,20 +168,32 @@ class LLMExtractor:
         Returns:
             提取的数据项列表
         """
-        # 创建一个包装模型
-        class ListWrapper(BaseModel):
-            items: List[item_schema]  # type: ignore
+        # 包装模型按item_schema缓存,避免每次调用重新构建
+        wrapper = self._list_wrappers.get(item_schema)
+        if wrapper is None:
+            class ListWrapper(BaseModel):
+                items: List[item_schema]  # type: ignore
+            
+            wrapper = self._list_wrappers[item_schema] = ListWrapper
         
-        result = self.extract(text, ListWrapper, instruction)
+        result = self.extract(text, wrapper, instruction)
         
         if result:
             return result.items
         else:
             return []
     
-    def _build_schema_description(self, schema: Type[BaseModel]) -> str:
-        """构建Schema的描述文本"""
-        schema_dict = schema.model_json_schema()
+    def _build_schema_description(
+        self,
+        schema: Type[BaseModel],
+        json_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """构建Schema的描述文本(按模型缓存)"""
+        cached = self._schema_descriptions.get(schema)
+        if cached is not None:
+            return cached
+        
+        schema_dict = json_schema or schema.model_json_schema()
         
         description = f"模型名称: {schema.__name__}\n"
         
@@ -198,6 +216,7 @@ class LLMExtractor:
             if "examples" in field_info:
                 description += f"    示例: {field_info['examples']}\n"
         
+        self._schema_descriptions[schema] = description
         return description
     
     def validate_quality(self, text: str, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -294,6 +313,7 @@ class HybridLLMExtractor(LLMExtractor):
         text: str,
         schema: Type[BaseModel],
         instruction: Optional[str] = None,
+        json_schema: Optional[Dict[str, Any]] = None,
         force_commercial: bool = False
     ) -> Optional[BaseModel]:
         """
@@ -303,6 +323,7 @@ class HybridLLMExtractor(LLMExtractor):
             text: 要提取的文本
             schema: 数据模型
             instruction: 额外指令
+            json_schema: 预先计算的JSON Schema(可选)
             force_commercial: 是否强制使用商用API
         
         Returns:
@@ -310,15 +331,15 @@ class HybridLLMExtractor(LLMExtractor):
         """
         if force_commercial:
             self.logger.info("强制使用商用API")
-            return self.commercial_extractor.extract(text, schema, instruction)
+            return self.commercial_extractor.extract(text, schema, instruction, json_schema)
         
         # 先尝试本地模型
         self.logger.info("尝试使用本地模型提取")
-        result = super().extract(text, schema, instruction)
+        result = super().extract(text, schema, instruction, json_schema)
         
         if result is None:
             self.logger.warning("本地模型提取失败,切换到商用API")
-            return self.commercial_extractor.extract(text, schema, instruction)
+            return self.commercial_extractor.extract(text, schema, instruction, json_schema)
         
         # 验证质量
         quality = self.validate_quality(text, result.model_dump())
@@ -326,7 +347,7 @@ class HybridLLMExtractor(LLMExtractor):
         
         if overall_score < self.quality_threshold:
             self.logger.warning(f"本地模型质量不达标({overall_score:.1f} < {self.quality_threshold}),切换到商用API")
-            return self.commercial_extractor.extract(text, schema, instruction)
+            return self.commercial_extractor.extract(text, schema, instruction, json_schema)
         
         self.logger.info(f"本地模型提取成功,质量评分: {overall_score:.1f}")
         return result
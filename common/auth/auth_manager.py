@@ -14,6 +14,10 @@ import base64
 from pathlib import Path
 
 
+# Credential fields stored encrypted
+_SENSITIVE_KEYS = frozenset({'password', 'api_key', 'secret', 'token'})
+
+
 class AuthManager:
     """
     Manages authentication credentials for all platforms.
@@ -90,7 +94,7 @@ class AuthManager:
         for platform, creds in credentials.items():
             decrypted[platform] = {}
             for key, value in creds.items():
-                if key in ['password', 'api_key', 'secret', 'token']:
+                if key in _SENSITIVE_KEYS:
                     try:
                         # Decrypt if value is encrypted (starts with 'enc:')
                         if isinstance(value, str) and value.startswith('enc:'):
@@ -170,7 +174,7 @@ class AuthManager:
         encrypted = {}
         
         for key, value in credentials.items():
-            if key in ['password', 'api_key', 'secret', 'token'] and isinstance(value, str):
+            if key in _SENSITIVE_KEYS and isinstance(value, str):
                 encrypted_value = self.cipher.encrypt(value.encode()).decode()
                 encrypted[key] = f"enc:{encrypted_value}"
             else:
@@ -14,7 +14,143 @@ from scrapy.exceptions import CloseSpider
 import time
 import hashlib
 import json
+import threading
 from datetime import datetime
+from functools import lru_cache, partial
+from urllib.parse import urljoin
+from lxml import etree, html
+from parsel.csstranslator import HTMLTranslator
+from w3lib.encoding import html_body_declared_encoding, http_content_type_encoding
+
+
+# <base href> of a parsed page
+_BASE_HREF = etree.XPath('//base/@href', smart_strings=False)
+
+# HTML parsers by encoding, one set per thread
+_parsers = threading.local()
+
+
+def _html_parser(encoding: str) -> html.HTMLParser:
+    """
+    Return the calling thread's shared HTML parser for an encoding.
+    
+    collect_ids=False: no selector matches on @id, so the per-document ID
+    table Scrapy's default parser builds is skipped. Parsers are kept per
+    thread because an lxml parser must not be used by two threads at once,
+    and spiders may parse in the reactor thread pool.
+    """
+    by_encoding = _parsers.__dict__
+    parser = by_encoding.get(encoding)
+    
+    if parser is None:
+        try:
+            parser = html.HTMLParser(encoding=encoding, recover=True, collect_ids=False)
+        except LookupError:
+            # Encoding name libxml2 does not know
+            parser = _html_parser('utf-8')
+        by_encoding[encoding] = parser
+    
+    return parser
+
+
+_css_to_xpath = HTMLTranslator().css_to_xpath
+
+
+def compile_xpath(query: str) -> etree.XPath:
+    """Compile an XPath query once."""
+    return etree.XPath(query, smart_strings=False)
+
+
+def css_xpath(css: str) -> etree.XPath:
+    """Translate a Scrapy CSS selector (``::text``/``::attr`` included) and compile it once."""
+    return etree.XPath(_css_to_xpath(css), smart_strings=False)
+
+
+# Text nodes of a subtree in document order (comments excluded, like string())
+_TEXT_NODES = etree.XPath('descendant-or-self::text()', smart_strings=False)
+
+
+def block_text(el) -> str:
+    """
+    Return an element's text content with its text nodes joined by spaces.
+    
+    Unlike XPath string(), adjacent blocks in minified markup stay apart:
+    <p>A.</p><p>B.</p> gives 'A. B.', not 'A.B.'.
+    """
+    return ' '.join(_TEXT_NODES(el))
+
+
+def css_text(css: str):
+    """Compile a function returning the text content of the first element matching a CSS selector ('' if none)."""
+    xpath = css_xpath(css)
+    
+    def first_text(root) -> str:
+        matches = xpath(root)
+        return block_text(matches[0]) if matches else ''
+    
+    return first_text
+
+
+def first_match(root, xpath: etree.XPath):
+    """Return the first match of a precompiled XPath, or None."""
+    values = xpath(root)
+    return values[0] if values else None
+
+
+def own_text(el) -> list:
+    """Return the element's direct text nodes in document order (like '::text')."""
+    texts = [el.text] if el.text else []
+    texts.extend(child.tail for child in el if child.tail)
+    return texts
+
+
+def field_collector(fields: Dict[tuple, tuple]):
+    """
+    Compile a field table into a function that reads every field in one tree walk.
+    
+    The table maps (tag, class) to (field, source). Source 'text' takes the
+    element's own text nodes, anything else is an attribute name. The
+    returned function walks an lxml element once and returns the first raw
+    value of every field in table order, None when missing (like get()).
+    This replaces one XPath evaluation over the tree per field.
+    
+    Args:
+        fields: (tag, class) -> (field, source) table
+        
+    Returns:
+        Function mapping an lxml element to a {field: raw value} dictionary
+    """
+    tags = tuple({tag for tag, _ in fields})
+    names = tuple(dict.fromkeys(name for name, _ in fields.values()))
+    
+    @lru_cache(maxsize=4096)
+    def specs(tag: str, classes: str) -> tuple:
+        # Pages share one template, so each distinct class attribute is
+        # split and looked up once
+        found = (fields.get((tag, css_class)) for css_class in classes.split())
+        return tuple(spec for spec in found if spec is not None)
+    
+    def collect(root) -> Dict[str, Optional[str]]:
+        values = dict.fromkeys(names)
+        
+        for el in root.iter(*tags):
+            classes = el.get('class')
+            if not classes:
+                continue
+            
+            for name, source in specs(el.tag, classes):
+                if values[name] is not None:
+                    continue
+                
+                if source == 'text':
+                    texts = own_text(el)
+                    values[name] = texts[0] if texts else None
+                else:
+                    values[name] = el.get(source)
+        
+        return values
+    
+    return collect
 
 
 class BaseSpider(scrapy.Spider):
@@ -177,12 +313,17 @@ class BaseSpider(scrapy.Spider):
         """
         raise NotImplementedError("Subclasses must implement parse_detail_page()")
     
-    def extract_common_metadata(self, response: Response) -> Dict[str, Any]:
+    def extract_common_metadata(self, response: Response, root=None) -> Dict[str, Any]:
         """
         Extract common metadata fields present in all platforms.
         
+        The default fields come from the response alone. Spiders that parse
+        the page with parse_html pass the tree as root, so an override that
+        reads page-level metadata reuses it instead of parsing again.
+        
         Args:
             response: Response object
+            root: Tree returned by parse_html, if already built by the caller
             
         Returns:
             Dictionary with common metadata
@@ -195,6 +336,50 @@ class BaseSpider(scrapy.Spider):
             'track_id': self.generate_track_id(response.url),
         }
     
+    def parse_html(self, response: Response):
+        """
+        Parse the response body into an lxml tree with a lean parser.
+        
+        Parses the raw body bytes in the encoding declared by the
+        Content-Type header or the page itself (UTF-8 otherwise), so the
+        body is never decoded to a str first.
+        
+        Args:
+            response: HTML response
+            
+        Returns:
+            Root lxml element (an lxml.html element, as with response.selector.root)
+        """
+        encoding = (
+            http_content_type_encoding(response.headers.get(b'Content-Type', b'').decode('latin-1'))
+            or html_body_declared_encoding(response.body)
+            or 'utf-8'
+        )
+        
+        # libxml2 stops at NUL bytes
+        body = response.body.replace(b'\x00', b'') or b'<html/>'
+        root = etree.fromstring(body, parser=_html_parser(encoding), base_url=response.url)
+        
+        return root if root is not None else etree.fromstring(b'<html/>', parser=_html_parser(encoding))
+    
+    def url_joiner(self, response: Response, root):
+        """
+        Return urljoin bound to the page's base URL.
+        
+        Same result as response.urljoin (honours <base href>), but the base
+        is read from the parsed tree instead of decoding the body to text.
+        
+        Args:
+            response: HTML response
+            root: Tree returned by parse_html
+            
+        Returns:
+            Function mapping a (relative) link to an absolute URL
+        """
+        base_hrefs = _BASE_HREF(root)
+        base_url = urljoin(response.url, base_hrefs[0].strip()) if base_hrefs else response.url
+        return partial(urljoin, base_url)
+    
     def generate_track_id(self, url: str) -> str:
         """
         Generate a unique track ID for a URL.
@@ -228,6 +413,34 @@ class BaseSpider(scrapy.Spider):
         
         return text.strip()
     
+    def _txt(self, root, xpath: etree.XPath) -> str:
+        """Evaluate a precompiled XPath on an lxml element and clean the first match."""
+        values = xpath(root)
+        return self.clean_text(values[0]) if values else ""
+    
+    def clean_texts(self, values: Dict[str, Optional[str]]) -> Dict[str, str]:
+        """
+        Clean several text values at once; same result as clean_text per value.
+        
+        The values are joined with a NUL separator so whitespace is normalized
+        in a single pass over one string, then split back by key.
+        
+        Args:
+            values: Raw texts keyed by field name
+            
+        Returns:
+            Cleaned texts under the same keys
+        """
+        raw = [value or '' for value in values.values()]
+        joined = '\0'.join(raw)
+        
+        if joined.count('\0') != len(raw) - 1:
+            # A value contains NUL itself; clean one by one
+            return {key: self.clean_text(value) for key, value in values.items()}
+        
+        cleaned = ' '.join(joined.split()).split('\0')
+        return {key: text.strip() for key, text in zip(values, cleaned)}
+    
     def handle_error(self, failure):
         """
         Handle request errors and failures.
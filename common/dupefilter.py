@@ -0,0 +1,103 @@
+"""
+Persistent Request Deduplication
+
+Dupefilter that remembers detail pages across spider runs, so incremental
+crawls skip pages already scraped by a previous run.
+"""
+
+import os
+from pathlib import Path
+
+from scrapy.dupefilters import RFPDupeFilter
+
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+
+
+class BloomDupeFilter(RFPDupeFilter):
+    """
+    RFPDupeFilter plus a Bloom filter of request fingerprints kept on disk.
+    
+    Within a run it behaves exactly like Scrapy's default dupefilter. In
+    addition, requests whose callback is listed in BLOOM_DUPEFILTER_CALLBACKS
+    (detail pages by default) are recorded in a per-spider Bloom filter that
+    is loaded when the spider opens and saved when it closes; later runs
+    drop those requests before they are downloaded. Start and list pages are
+    never persisted, so a new run still discovers new links.
+    
+    Requests are recorded when scheduled, so a detail page that failed is
+    also skipped next time; delete the filter file to force a full recrawl.
+    Without pybloom_live installed it falls back to plain RFPDupeFilter.
+    
+    Settings:
+        BLOOM_DUPEFILTER_DIR: Directory for the filter files (default 'data/cache/bloom')
+        BLOOM_DUPEFILTER_CALLBACKS: Callback names to persist (default ['parse_detail_page'])
+        BLOOM_DUPEFILTER_ERROR_RATE: False positive rate (default 0.0001)
+    
+    Enable it with:
+        DUPEFILTER_CLASS = 'common.dupefilter.BloomDupeFilter'
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bloom = None
+        self.bloom_path = None
+        self.callbacks = frozenset()
+        self.error_rate = 1e-4
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        dupefilter = super().from_crawler(crawler)
+        
+        if ScalableBloomFilter is None:
+            dupefilter.logger.warning("pybloom_live not installed: visited pages are not kept across runs")
+            return dupefilter
+        
+        settings = crawler.settings
+        bloom_dir = Path(settings.get('BLOOM_DUPEFILTER_DIR', 'data/cache/bloom'))
+        dupefilter.bloom_path = bloom_dir / f'{crawler.spider.name}.bloom'
+        dupefilter.callbacks = frozenset(
+            settings.getlist('BLOOM_DUPEFILTER_CALLBACKS', ['parse_detail_page'])
+        )
+        dupefilter.error_rate = settings.getfloat('BLOOM_DUPEFILTER_ERROR_RATE', 1e-4)
+        
+        return dupefilter
+    
+    def open(self):
+        """Load the filter saved by the previous run, if any."""
+        super().open()
+        
+        if self.bloom_path is None:
+            return
+        
+        if self.bloom_path.exists():
+            with open(self.bloom_path, 'rb') as f:
+                self.bloom = ScalableBloomFilter.fromfile(f)
+            self.logger.info(f"Loaded {len(self.bloom)} visited pages from {self.bloom_path}")
+        else:
+            self.bloom = ScalableBloomFilter(initial_capacity=100_000, error_rate=self.error_rate)
+    
+    def request_seen(self, request) -> bool:
+        if super().request_seen(request):
+            return True
+        
+        if self.bloom is None or getattr(request.callback, '__name__', None) not in self.callbacks:
+            return False
+        
+        # add() returns True if the fingerprint was already present
+        return self.bloom.add(self.request_fingerprint(request))
+    
+    def close(self, reason):
+        """Save the filter for the next run (written to a temp file, then swapped in)."""
+        super().close(reason)
+        
+        if self.bloom is None:
+            return
+        
+        self.bloom_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.bloom_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            self.bloom.tofile(f)
+        os.replace(tmp_path, self.bloom_path)
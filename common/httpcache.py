@@ -0,0 +1,23 @@
+"""
+HTTP Cache Policies
+
+Cache policies for Scrapy's HttpCacheMiddleware (HTTPCACHE_POLICY).
+"""
+
+from scrapy.extensions.httpcache import RFC2616Policy
+
+
+class RobotsTxtCachePolicy(RFC2616Policy):
+    """
+    RFC2616Policy restricted to robots.txt.
+    
+    Repeated local runs reuse robots.txt according to the server's
+    cache-control headers, while every page is downloaded fresh. Spiders
+    that want page caching (e.g. a development cache) enable it themselves.
+    
+    Enable it with:
+        HTTPCACHE_POLICY = 'common.httpcache.RobotsTxtCachePolicy'
+    """
+    
+    def should_cache_request(self, request):
+        return request.url.endswith('/robots.txt') and super().should_cache_request(request)
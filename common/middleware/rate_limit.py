@@ -8,6 +8,7 @@ import logging
 from typing import Dict, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict
+from email.utils import parsedate_to_datetime
 import pickle
 import os
 
@@ -380,3 +381,161 @@ class ScrapySessionMiddleware:
             self.session_manager.save_session(platform, cookies)
         
         return response
+
+
+class RetryAfterMiddleware:
+    """
+    429响应退避中间件
+    
+    收到HTTP 429且带有Retry-After头时,按服务器要求的时间延迟后重试,
+    而不是像RetryMiddleware那样立即重试。没有Retry-After头的429
+    交给RetryMiddleware按RETRY_HTTP_CODES处理。
+    
+    需要排在RetryMiddleware(550)之后处理响应,即优先级数值大于550。
+    """
+    
+    def __init__(self, max_delay: float = 60.0, max_retries: int = 3):
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        max_delay = crawler.settings.getfloat(
+            'RETRY_AFTER_MAX_DELAY',
+            crawler.settings.getfloat('AUTOTHROTTLE_MAX_DELAY', 60.0)
+        )
+        max_retries = crawler.settings.getint('RETRY_TIMES', 3)
+        return cls(max_delay=max_delay, max_retries=max_retries)
+    
+    def process_response(self, request, response, spider):
+        """429时延迟Retry-After秒后重新调度请求"""
+        if response.status != 429:
+            return response
+        
+        delay = self._parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            return response
+        
+        retries = request.meta.get('retry_after_times', 0) + 1
+        if retries > self.max_retries:
+            self.logger.warning(f"429重试次数已用尽: {request.url}")
+            return response
+        
+        delay = min(delay, self.max_delay)
+        self.logger.info(f"收到429, {delay:.1f}秒后重试 ({retries}/{self.max_retries}): {request.url}")
+        
+        retry_request = request.replace(dont_filter=True)
+        retry_request.meta['retry_after_times'] = retries
+        
+        from twisted.internet import reactor
+        from twisted.internet.task import deferLater
+        return deferLater(reactor, delay, lambda: retry_request)
+    
+    @staticmethod
+    def _parse_retry_after(value) -> Optional[float]:
+        """解析Retry-After头(秒数或HTTP日期)"""
+        if not value:
+            return None
+        
+        if isinstance(value, bytes):
+            value = value.decode('latin-1')
+        value = value.strip()
+        
+        if value.isdigit():
+            return float(value)
+        
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        
+        return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+
+# 令牌桶(按槽位共享): 返回还需等待的秒数,0表示已取得令牌
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucketMiddleware:
+    """
+    跨进程共享的请求限流中间件
+    
+    DOWNLOAD_DELAY只在单个爬虫进程内生效,多个进程同时采集同一站点时
+    请求速率会叠加。该中间件用Redis中的令牌桶(Lua脚本原子执行)
+    按下载槽位(meta['download_slot']或域名)统一限流。
+    
+    未配置REDIS_THROTTLE_URL时不启用。Redis调用在reactor线程池中执行,
+    超过REDIS_THROTTLE_TIMEOUT秒无响应或Redis不可用时放行请求
+    (仅由本进程的DOWNLOAD_DELAY限流)。
+    """
+    
+    def __init__(self, client, rate: float, burst: int, key_prefix: str = 'throttle'):
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.key_prefix = key_prefix
+        self._acquire = client.register_script(_TOKEN_BUCKET_LUA)
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        from scrapy.exceptions import NotConfigured
+        
+        url = crawler.settings.get('REDIS_THROTTLE_URL')
+        if not url:
+            raise NotConfigured('REDIS_THROTTLE_URL未设置')
+        
+        try:
+            import redis
+        except ImportError:
+            raise NotConfigured('redis未安装')
+        
+        delay = crawler.settings.getfloat('DOWNLOAD_DELAY', 1.0) or 1.0
+        rate = crawler.settings.getfloat('REDIS_THROTTLE_RATE', 1.0 / delay)
+        burst = crawler.settings.getint('REDIS_THROTTLE_BURST', 1)
+        timeout = crawler.settings.getfloat('REDIS_THROTTLE_TIMEOUT', 2.0)
+        
+        client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        return cls(client, rate=rate, burst=burst)
+    
+    async def process_request(self, request, spider):
+        """取得令牌前等待(Redis调用和等待都不阻塞reactor)"""
+        from redis.exceptions import RedisError
+        from twisted.internet import reactor
+        from twisted.internet.task import deferLater
+        from twisted.internet.threads import deferToThread
+        
+        slot = request.meta.get('download_slot') or request.url.split('/')[2]
+        key = f"{self.key_prefix}:{slot}"
+        
+        while True:
+            try:
+                wait = float(await deferToThread(
+                    self._acquire, keys=[key], args=[self.rate, self.burst]
+                ))
+            except RedisError as e:
+                self.logger.warning(f"Redis限流不可用,直接放行 (槽位: {slot}): {e}")
+                return None
+            if wait <= 0:
+                return None
+            self.logger.debug(f"等待令牌 {wait:.2f}秒 (槽位: {slot})")
+            await deferLater(reactor, wait, lambda: None)
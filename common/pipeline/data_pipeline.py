@@ -11,6 +11,7 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
+from itemadapter import ItemAdapter
 
 
 class DataPipeline:
@@ -316,7 +317,8 @@ class ScrapyPipeline:
     
     def process_item(self, item, spider):
         """Process item through pipeline."""
-        result = self.pipeline.process_item(dict(item), spider)
+        # ItemAdapter accepts dicts, scrapy Items and dataclass items alike
+        result = self.pipeline.process_item(ItemAdapter(item).asdict(), spider)
         
         if result is None:
             # Item was filtered out
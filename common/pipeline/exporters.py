@@ -0,0 +1,71 @@
+"""
+Feed Exporters
+
+Item exporters used by the Scrapy feed exports (FEEDS / FEED_EXPORTERS).
+
+orjson is optional: without it (e.g. on PyPy, where it has no wheel) the
+exporter names below resolve to Scrapy's stock JSON exporters, which write
+the same output.
+"""
+
+from scrapy.exporters import JsonItemExporter, JsonLinesItemExporter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonLinesItemExporter(JsonLinesItemExporter):
+    """
+    JSON Lines exporter that serializes items with orjson.
+    
+    orjson writes UTF-8 bytes directly, so there is no str -> bytes encode
+    step per item. Types orjson does not know natively (Decimal, sets,
+    Requests, ...) fall back to the exporter's ScrapyJSONEncoder.
+    
+    Enable it for the 'jsonlines' feed format:
+        FEED_EXPORTERS = {
+            'jsonlines': 'common.pipeline.exporters.OrjsonLinesItemExporter',
+        }
+    """
+    
+    def export_item(self, item):
+        itemdict = dict(self._get_serialized_fields(item))
+        option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+        self.file.write(orjson.dumps(itemdict, default=self.encoder.default, option=option))
+
+
+class OrjsonItemExporter(JsonItemExporter):
+    """
+    JSON array exporter that serializes items with orjson.
+    
+    Same output structure as JsonItemExporter; FEED_EXPORT_INDENT > 0 maps
+    to orjson's two-space indentation, the only one it supports.
+    
+    Enable it for the 'json' feed format:
+        FEED_EXPORTERS = {
+            'json': 'common.pipeline.exporters.OrjsonItemExporter',
+        }
+    """
+    
+    def export_item(self, item):
+        itemdict = dict(self._get_serialized_fields(item))
+        option = orjson.OPT_NON_STR_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        
+        # Serialize before writing the separator, so a failing item leaves no stray comma
+        data = orjson.dumps(itemdict, default=self.encoder.default, option=option)
+        
+        if self.first_item:
+            self.first_item = False
+        else:
+            self.file.write(b',')
+            self._beautify_newline()
+        self.file.write(data)
+
+
+if orjson is None:
+    OrjsonLinesItemExporter = JsonLinesItemExporter
+    OrjsonItemExporter = JsonItemExporter
@@ -0,0 +1,265 @@
+"""
+PostgreSQL Storage Pipeline
+
+Buffers scraped items and bulk-loads them into PostgreSQL with COPY.
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+from twisted.internet import reactor
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+
+# Items are heterogeneous across platforms: common metadata gets its own
+# columns, the full item is kept as JSONB
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    track_id    TEXT NOT NULL,
+    platform    TEXT NOT NULL,
+    source_url  TEXT,
+    scraped_at  TIMESTAMP,
+    data        JSONB NOT NULL
+)
+"""
+
+_COLUMNS = ('track_id', 'platform', 'source_url', 'scraped_at', 'data')
+
+
+class PostgresCopyPipeline:
+    """
+    Scrapy pipeline that stores items in PostgreSQL in batches.
+    
+    Items are buffered in memory and written with a single COPY per batch
+    instead of one INSERT per item. A batch is flushed when it reaches
+    POSTGRES_COPY_BATCH_SIZE items, when POSTGRES_COPY_FLUSH_SECS have passed
+    since the last flush (checked as items arrive), and when the spider closes.
+    COPY runs on a single worker thread so the reactor keeps downloading.
+    
+    If a COPY fails, the batch is retried one INSERT per row so a single bad
+    row does not lose the whole batch. Rows that still fail are appended to
+    a dead-letter JSON Lines file (one item per line) and counted in the
+    crawl stats. After POSTGRES_MAX_FAILED_BATCHES consecutive batches with
+    dead-lettered rows the spider is closed instead of scraping on into the
+    dead-letter file.
+    
+    Settings:
+        POSTGRES_DSN: libpq connection string; the pipeline is disabled if unset
+        POSTGRES_ITEMS_TABLE: Target table (default 'scraped_items')
+        POSTGRES_COPY_BATCH_SIZE: Items per COPY (default 500)
+        POSTGRES_COPY_FLUSH_SECS: Maximum age of a partial batch (default 5)
+        POSTGRES_DEAD_LETTER_DIR: Directory for rows that could not be stored
+            (default 'data/failed/postgres')
+        POSTGRES_MAX_FAILED_BATCHES: Consecutive failed batches before the
+            spider is closed (default 3)
+    
+    Enable it after the validation pipeline:
+        ITEM_PIPELINES = {
+            'common.pipeline.data_pipeline.ScrapyPipeline': 300,
+            'common.pipeline.postgres_pipeline.PostgresCopyPipeline': 400,
+        }
+    """
+    
+    def __init__(self, dsn: str, table: str = 'scraped_items',
+                 batch_size: int = 500, flush_secs: float = 5.0,
+                 dead_letter_dir: str = 'data/failed/postgres',
+                 max_failed_batches: int = 3):
+        self.dsn = dsn
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_secs = flush_secs
+        self.dead_letter_dir = Path(dead_letter_dir)
+        self.max_failed_batches = max_failed_batches
+        
+        self.logger = logging.getLogger(__name__)
+        self._buffer: List[Tuple] = []
+        self._last_flush = time.monotonic()
+        self._conn = None
+        self._pool = None
+        self._crawler = None
+        self._spider = None
+        self._failed_batches = 0
+        self._closing = False
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        dsn = crawler.settings.get('POSTGRES_DSN')
+        if not dsn:
+            raise NotConfigured('POSTGRES_DSN is not set')
+        
+        if psycopg2 is None:
+            raise NotConfigured('psycopg2 is not installed')
+        
+        pipeline = cls(
+            dsn,
+            table=crawler.settings.get('POSTGRES_ITEMS_TABLE', 'scraped_items'),
+            batch_size=crawler.settings.getint('POSTGRES_COPY_BATCH_SIZE', 500),
+            flush_secs=crawler.settings.getfloat('POSTGRES_COPY_FLUSH_SECS', 5.0),
+            dead_letter_dir=crawler.settings.get('POSTGRES_DEAD_LETTER_DIR', 'data/failed/postgres'),
+            max_failed_batches=crawler.settings.getint('POSTGRES_MAX_FAILED_BATCHES', 3),
+        )
+        pipeline._crawler = crawler
+        return pipeline
+    
+    def open_spider(self, spider):
+        """Connect and make sure the target table exists."""
+        self._conn = psycopg2.connect(self.dsn)
+        with self._conn, self._conn.cursor() as cursor:
+            cursor.execute(_CREATE_TABLE_SQL.format(table=self.table))
+        
+        self._spider = spider
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='postgres-copy')
+        spider.logger.info(f"Postgres pipeline opened (table: {self.table})")
+    
+    def close_spider(self, spider):
+        """Flush the remaining items and wait for all COPYs to finish."""
+        self._flush()
+        self._pool.shutdown(wait=True)
+        self._conn.close()
+    
+    def process_item(self, item, spider):
+        """Buffer the item and flush when the batch is full or old enough."""
+        adapter = ItemAdapter(item)
+        self._buffer.append((
+            adapter.get('track_id'),
+            adapter.get('platform') or spider.name,
+            adapter.get('source_url'),
+            adapter.get('scraped_at'),
+            json.dumps(adapter.asdict(), ensure_ascii=False, default=str),
+        ))
+        
+        if (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_secs):
+            self._flush()
+        
+        return item
+    
+    def _flush(self):
+        """Hand the current batch to the COPY worker."""
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        
+        rows, self._buffer = self._buffer, []
+        future = self._pool.submit(self._write_batch, rows)
+        future.add_done_callback(self._on_batch_done)
+    
+    def _write_batch(self, rows: List[Tuple]) -> bool:
+        """
+        Store one batch, falling back to row-by-row INSERTs (runs on the worker thread).
+        
+        Returns:
+            True if some rows could not be stored and went to the dead-letter file
+        """
+        try:
+            self._connect()
+            self._copy_rows(rows)
+            return False
+        except psycopg2.Error as e:
+            self.logger.warning(
+                f"COPY of {len(rows)} items into {self.table} failed, retrying row by row: {e}"
+            )
+            self._inc_stat('postgres/copy_failed_batches')
+        
+        failed = self._insert_rows(rows)
+        if not failed:
+            return False
+        
+        self._dead_letter(failed)
+        return True
+    
+    def _connect(self):
+        """Reconnect if a previous failure closed the connection."""
+        if self._conn.closed:
+            self._conn = psycopg2.connect(self.dsn)
+    
+    def _copy_rows(self, rows: List[Tuple]):
+        """Write one batch with COPY ... FROM STDIN."""
+        # CSV format quotes tabs, newlines and backslashes in the JSON for us
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        
+        with self._conn, self._conn.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {self.table} ({', '.join(_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        
+        self.logger.debug(f"Copied {len(rows)} items into {self.table}")
+    
+    def _insert_rows(self, rows: List[Tuple]) -> List[Tuple]:
+        """Insert rows one per transaction; return the rows that failed."""
+        sql = (
+            f"INSERT INTO {self.table} ({', '.join(_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(_COLUMNS))})"
+        )
+        failed = []
+        
+        for index, row in enumerate(rows):
+            try:
+                self._connect()
+                with self._conn, self._conn.cursor() as cursor:
+                    cursor.execute(sql, row)
+            except psycopg2.OperationalError as e:
+                # Connection lost: the remaining rows would fail the same way
+                self.logger.error(f"Lost connection while inserting into {self.table}: {e}")
+                failed.extend(rows[index:])
+                break
+            except psycopg2.Error as e:
+                self.logger.error(f"Failed to insert item {row[0]} into {self.table}: {e}")
+                failed.append(row)
+        
+        return failed
+    
+    def _dead_letter(self, rows: List[Tuple]):
+        """Append the items of rows that could not be stored to the dead-letter file."""
+        self._inc_stat('postgres/dead_letter_items', len(rows))
+        
+        path = self.dead_letter_dir / f'{self._spider.name}.jsonl'
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.writelines(row[-1] + '\n' for row in rows)
+        except OSError as e:
+            self.logger.error(f"Failed to write {len(rows)} items to {path}: {e}")
+            return
+        
+        self.logger.error(f"Wrote {len(rows)} items that could not be stored to {path}")
+    
+    def _inc_stat(self, key: str, count: int = 1):
+        if self._crawler is not None:
+            self._crawler.stats.inc_value(key, count, spider=self._spider)
+    
+    def _on_batch_done(self, future):
+        """Track consecutive failed batches and close the spider when there are too many."""
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Failed to store items into {self.table}: {error}")
+        
+        if error is None and not future.result():
+            self._failed_batches = 0
+            return
+        
+        self._failed_batches += 1
+        if (self._failed_batches >= self.max_failed_batches
+                and not self._closing and self._crawler is not None):
+            self._closing = True
+            self.logger.error(
+                f"{self._failed_batches} consecutive batches failed to store, closing spider"
+            )
+            reactor.callFromThread(
+                self._crawler.engine.close_spider, self._spider, 'postgres_store_failed'
+            )
@@ -13,29 +13,27 @@ Usage:
 
 import sys
 import argparse
+import functools
 import logging
+from importlib.metadata import EntryPoint, entry_points
 from pathlib import Path
-from scrapy.crawler import CrawlerProcess
+from scrapy.crawler import Crawler, CrawlerProcess
 from scrapy.utils.project import get_project_settings
 import yaml
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-# Import spiders
-from spiders.biolincc_spider import BiolinccSpider
-from spiders.openicpsr_spider import OpenicpsrSpider
-from spiders.bioportal_spider import BioportalSpider
-from spiders.kidsfirst_spider import KidsfirstSpider
-from spiders.nsrr_spider import NsrrSpider
-
-# Spider registry
-SPIDER_REGISTRY = {
-    'biolincc': BiolinccSpider,
-    'openicpsr': OpenicpsrSpider,
-    'bioportal': BioportalSpider,
-    'kidsfirst': KidsfirstSpider,
-    'nsrr': NsrrSpider,
+# Entry point group used by installed spider plugins
+SPIDER_ENTRY_POINT_GROUP = 'biomed.spiders'
+
+# Built-in spiders, referenced lazily as "module:Class"
+BUILTIN_SPIDERS = {
+    'biolincc': 'spiders.biolincc_spider:BiolinccSpider',
+    'openicpsr': 'spiders.openicpsr_spider:OpenicpsrSpider',
+    'bioportal': 'spiders.bioportal_spider:BioportalSpider',
+    'kidsfirst': 'spiders.kidsfirst_spider:KidsfirstSpider',
+    'nsrr': 'spiders.nsrr_spider:NsrrSpider',
 }
 
 
@@ -57,6 +55,51 @@ def load_platform_config():
     return {}
 
 
+def discover_spiders():
+    """
+    Build the spider registry without importing any spider module.
+    
+    Sources, in increasing priority:
+    1. Built-in spiders shipped with this repository
+    2. Platforms in config/platforms.yaml that declare a spider_class
+       (as written by scripts/add_platform.py)
+    3. Installed plugins registered under the 'biomed.spiders' entry point group
+    
+    Returns:
+        Dict mapping platform name to an EntryPoint; call .load() to import
+    """
+    registry = {
+        name: EntryPoint(name=name, value=value, group=SPIDER_ENTRY_POINT_GROUP)
+        for name, value in BUILTIN_SPIDERS.items()
+    }
+    
+    for platform_id, config in load_platform_config().items():
+        spider_class = (config or {}).get('spider_class')
+        if spider_class and platform_id not in registry:
+            registry[platform_id] = EntryPoint(
+                name=platform_id,
+                value=f'spiders.{platform_id}_spider:{spider_class}',
+                group=SPIDER_ENTRY_POINT_GROUP,
+            )
+    
+    for ep in entry_points(group=SPIDER_ENTRY_POINT_GROUP):
+        registry[ep.name] = ep
+    
+    return registry
+
+
+# Spider registry (lazy: spiders are imported only when run)
+SPIDER_REGISTRY = discover_spiders()
+
+
+@functools.lru_cache(maxsize=None)
+def _ensure_dir(path: str) -> Path:
+    """Create a directory once per process and return it."""
+    directory = Path(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
 def list_platforms():
     """List all available platforms."""
     platforms = load_platform_config()
@@ -79,53 +122,86 @@ def list_platforms():
     print("\n")
 
 
-def run_spider(spider_name, **kwargs):
+def build_settings(spider_name):
     """
-    Run a single spider.
+    Scrapy settings for running a spider locally.
     
     Args:
-        spider_name: Name of the spider to run
-        **kwargs: Additional arguments to pass to spider
+        spider_name: Platform name, used for the output directory
+        
+    Returns:
+        Settings dict
     """
-    if spider_name not in SPIDER_REGISTRY:
-        print(f"Error: Spider '{spider_name}' not found or not implemented yet.")
-        print(f"Available spiders: {', '.join(SPIDER_REGISTRY.keys())}")
-        return False
-    
-    spider_class = SPIDER_REGISTRY[spider_name]
-    
-    # Configure Scrapy settings
     settings = {
         'USER_AGENT': 'Mozilla/5.0 (compatible; BiomedicalResearchBot/1.0)',
         'ROBOTSTXT_OBEY': True,
+        'ROBOTSTXT_PARSER': 'scrapy.robotstxt.ProtegoRobotParser',
         'CONCURRENT_REQUESTS': 8,
         'DOWNLOAD_DELAY': 2,
         'COOKIES_ENABLED': True,
         'TELNETCONSOLE_ENABLED': False,
         'LOG_LEVEL': 'INFO',
         
+        # HTTP cache: repeated local runs reuse robots.txt according to the
+        # server's cache-control headers; pages are always fetched fresh
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_POLICY': 'common.httpcache.RobotsTxtCachePolicy',
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_DIR': 'data/cache/http',
+        'HTTPCACHE_IGNORE_HTTP_CODES': [500, 502, 503, 504, 408],
+        
         # Enable pipeline
         'ITEM_PIPELINES': {
             'common.pipeline.data_pipeline.ScrapyPipeline': 300,
         },
         
-        # Output settings
+        # Serialize JSON and JSON Lines feeds with orjson
+        'FEED_EXPORTERS': {
+            'json': 'common.pipeline.exporters.OrjsonItemExporter',
+            'jsonlines': 'common.pipeline.exporters.OrjsonLinesItemExporter',
+        },
+        
+        # Output settings (gzip-compressed JSONL)
         'FEEDS': {
-            f'data/raw/{spider_name}/%(name)s_%(time)s.jsonl': {
+            f'data/raw/{spider_name}/%(name)s_%(time)s.jsonl.gz': {
                 'format': 'jsonlines',
                 'encoding': 'utf8',
                 'store_empty': False,
                 'overwrite': False,
+                'postprocessing': ['scrapy.extensions.postprocessing.GzipPlugin'],
+                'gzip_compresslevel': 3,
             },
         },
+        
+        # Shared by all spiders of a process: more threads for DNS lookups
+        # and a shorter DNS timeout so one slow resolver doesn't stall the rest
+        'REACTOR_THREADPOOL_MAXSIZE': 20,
+        'DNS_TIMEOUT': 20,
     }
     
+    return settings
+
+
+def run_spider(spider_name, **kwargs):
+    """
+    Run a single spider.
+    
+    Args:
+        spider_name: Name of the spider to run
+        **kwargs: Additional arguments to pass to spider
+    """
+    if spider_name not in SPIDER_REGISTRY:
+        print(f"Error: Spider '{spider_name}' not found or not implemented yet.")
+        print(f"Available spiders: {', '.join(SPIDER_REGISTRY.keys())}")
+        return False
+    
+    spider_class = SPIDER_REGISTRY[spider_name].load()
+    
     # Create output directory
-    output_dir = Path(f'data/raw/{spider_name}')
-    output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir = _ensure_dir(f'data/raw/{spider_name}')
     
     # Create and configure crawler
-    process = CrawlerProcess(settings)
+    process = CrawlerProcess(build_settings(spider_name))
     
     print(f"\n=== Starting spider: {spider_name} ===\n")
     
@@ -145,7 +221,14 @@ def run_spider(spider_name, **kwargs):
 
 
 def run_all_spiders():
-    """Run all enabled spiders sequentially."""
+    """
+    Run all enabled spiders concurrently in one process.
+    
+    All crawlers share a single CrawlerProcess, so they run on one Twisted
+    reactor with a shared DNS cache and thread pool. A reactor cannot be
+    restarted, so a separate CrawlerProcess per spider would only work for
+    the first one.
+    """
     platforms = load_platform_config()
     
     enabled_platforms = [
@@ -159,10 +242,27 @@ def run_all_spiders():
     
     print(f"\n=== Running {len(enabled_platforms)} enabled spiders ===\n")
     
+    # Process-level settings (logging, reactor thread pool, DNS) apply to all crawlers
+    process = CrawlerProcess(build_settings('all'))
     results = {}
+    
+    def finished(_, platform_id):
+        results[platform_id] = True
+    
+    def failed(failure, platform_id):
+        print(f"\n=== Spider failed: {platform_id} ===")
+        print(f"Error: {failure.value}")
+        results[platform_id] = False
+    
     for platform_id in enabled_platforms:
-        success = run_spider(platform_id)
-        results[platform_id] = success
+        # Each crawler keeps its own settings (feed output per platform)
+        crawler = Crawler(SPIDER_REGISTRY[platform_id].load(), build_settings(platform_id))
+        _ensure_dir(f'data/raw/{platform_id}')
+        
+        deferred = process.crawl(crawler)
+        deferred.addCallbacks(finished, failed, callbackArgs=(platform_id,), errbackArgs=(platform_id,))
+    
+    process.start()
     
     # Print summary
     print("\n=== Summary ===\n")
@@ -3,10 +3,20 @@ AI增强的Spider示例
 展示如何使用LLM辅助提取复杂、非结构化的数据
 """
 
+import re
+import json
+import hashlib
 import scrapy
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
 from typing import Optional, List
+from parsel.csstranslator import HTMLTranslator
 from pydantic import BaseModel, Field, HttpUrl
 from datetime import datetime
+from twisted.internet import reactor
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
 
 from common.base_spider import BaseSpider
 from common.ai.llm_extractor import HybridLLMExtractor
@@ -40,6 +50,44 @@ class Publication(BaseModel):
         }
 
 
+class Comment(BaseModel):
+    """评论信息"""
+    author: str = Field(description="评论者姓名")
+    content: str = Field(description="评论内容")
+    date: Optional[str] = Field(default=None, description="评论日期")
+    replies: List['Comment'] = Field(default_factory=list, description="回复列表")
+
+
+# 解析前向引用,导入时一次性构建模型
+Comment.model_rebuild()
+
+# 预先计算JSON Schema,避免每次提取时重复构建
+_PUBLICATION_SCHEMA = Publication.model_json_schema()
+
+# CSS选择器在导入时一次性编译为XPath
+_css_to_xpath = HTMLTranslator().css_to_xpath
+
+# 空白字符规范化
+_WS_RE = re.compile(r'\s+')
+
+# 未安装tiktoken时的字符数上限
+_MAX_INPUT_CHARS = 10000
+
+# 页面内容去重缓存(跨运行持久化)
+_EXTRACTION_CACHE_FILE = Path('data/cache/ai_extract/seen.json')
+_EXTRACTION_CACHE_SIZE = 10000
+
+
+@lru_cache(maxsize=None)
+def _get_token_encoding():
+    """加载tokenizer(进程内只加载一次),未安装tiktoken时返回None"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding('cl100k_base')
+
+
 class AIEnhancedSpider(BaseSpider):
     """
     AI增强的Spider
@@ -66,8 +114,19 @@ class AIEnhancedSpider(BaseSpider):
         'AI_LOCAL_MODEL': 'llama3.1:8b',
         'AI_COMMERCIAL_MODEL': 'gpt-4o-mini',
         'AI_QUALITY_THRESHOLD': 7.0,
+        'AI_MAX_INPUT_TOKENS': 3000,  # 按token而非字符限制输入长度
+        # AI提取使用独立线程池的线程数(不占用reactor线程池,后者还负责DNS解析)
+        'AI_MAX_CONCURRENCY': 40,
     }
     
+    # 预编译的选择器
+    _BODY_TEXT_XPATH = _css_to_xpath('body ::text')
+    _MAIN_XPATH = _css_to_xpath('main, article, .content, #content')
+    _TITLE_TEXT_XPATH = _css_to_xpath('h1.title::text')
+    _AUTHOR_TEXT_XPATH = _css_to_xpath('.author::text')
+    _COMMENTS_XPATH = _css_to_xpath('.comments, #comments, .discussion')
+    _TEXT_XPATH = _css_to_xpath('::text')
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
@@ -88,6 +147,18 @@ class AIEnhancedSpider(BaseSpider):
             )
         
         self.logger.info(f"AI提取器已初始化: mode={ai_mode}")
+        
+        # 内容指纹 -> 提取结果(LRU),相同页面内容不重复调用LLM
+        self._extraction_cache: OrderedDict = self._load_extraction_cache()
+        
+        # LLM调用专用线程池: REACTOR_THREADPOOL_MAXSIZE只在爬虫进程启动时生效,
+        # 写在custom_settings里不会扩大reactor线程池
+        self._llm_pool = ThreadPool(
+            minthreads=0,
+            maxthreads=self.settings.getint('AI_MAX_CONCURRENCY', 40),
+            name='llm-extract'
+        )
+        self._llm_pool.start()
     
     def parse_detail_page(self, response):
         """
@@ -102,35 +173,74 @@ class AIEnhancedSpider(BaseSpider):
         - 提取页面文本
         - 让LLM理解并提取
         - 自动处理各种格式
+        
+        Returns:
+            item列表(命中缓存时),或在线程池中执行提取的Deferred
         """
         # 提取页面主要文本内容
-        # 方法1: 使用Scrapy的内置方法
-        page_text = ' '.join(response.css('body ::text').getall())
-        
-        # 方法2: 只提取主要内容区域(推荐)
-        main_content = response.css('main, article, .content, #content').get()
+        # 优先只提取主要内容区域(推荐),直接在原文档树上取文本,无需重新解析
+        main_content = response.xpath(self._MAIN_XPATH)
         if main_content:
-            page_text = scrapy.Selector(text=main_content).css('::text').getall()
-            page_text = ' '.join(page_text)
+            page_text = ' '.join(main_content[0].xpath(self._TEXT_XPATH).getall())
+        else:
+            # 回退: 提取整个body的文本
+            page_text = ' '.join(response.xpath(self._BODY_TEXT_XPATH).getall())
         
-        # 清理文本
-        page_text = ' '.join(page_text.split())  # 规范化空白字符
-        page_text = page_text[:10000]  # 限制长度以节省token
+        # 清理文本: 先截断再规范化空白字符
+        page_text = _WS_RE.sub(' ', page_text[:20000]).strip()
+        # 限制长度以节省token
+        page_text = self._truncate_to_tokens(
+            page_text, self.settings.getint('AI_MAX_INPUT_TOKENS', 3000)
+        )
+        
+        # 内容相同的页面(如预印本的多个版本)直接复用之前的提取结果
+        fingerprint = hashlib.md5(page_text.encode()).hexdigest()
+        publication = self._extraction_cache.get(fingerprint)
+        
+        if publication is not None:
+            self._extraction_cache.move_to_end(fingerprint)
+            self.logger.info(f"页面内容重复,复用提取结果: {response.url}")
+            return [self._build_publication_item(response, publication)]
         
         self.logger.info(f"开始AI提取: {response.url}, 文本长度: {len(page_text)}")
         
-        # 使用AI提取结构化数据
-        publication = self.ai_extractor.extract(
+        # LLM调用和Pydantic验证在线程池中执行,reactor可以继续处理其他下载
+        d = deferToThreadPool(
+            reactor,
+            self._llm_pool,
+            self.ai_extractor.extract,
             text=page_text,
             schema=Publication,
+            json_schema=_PUBLICATION_SCHEMA,
             instruction="请特别注意提取所有作者的完整信息,包括姓名、机构和邮箱"
         )
-        
+        d.addCallbacks(
+            self._on_publication_extracted,
+            self._on_extraction_error,
+            callbackArgs=(response, fingerprint),
+            errbackArgs=(response,)
+        )
+        return d
+    
+    def _on_publication_extracted(self, publication, response, fingerprint):
+        """AI提取完成后的回调(在reactor线程中执行)"""
         if publication is None:
             self.logger.error(f"AI提取失败: {response.url}")
-            return
+            return []
+        
+        self._extraction_cache[fingerprint] = publication
+        if len(self._extraction_cache) > _EXTRACTION_CACHE_SIZE:
+            self._extraction_cache.popitem(last=False)
         
-        # 转换为item格式
+        return [self._build_publication_item(response, publication)]
+    
+    def _on_extraction_error(self, failure, response):
+        """LLM调用或结果验证抛出异常时记录错误,不产生item"""
+        self.logger.error(f"AI提取异常: {response.url}: {failure.getErrorMessage()}")
+        return []
+    
+    def _build_publication_item(self, response, publication):
+        """将提取结果转换为item格式"""
         item = self.extract_common_metadata(response)
         item.update(publication.model_dump())
         
@@ -140,7 +250,59 @@ class AIEnhancedSpider(BaseSpider):
         
         self.logger.info(f"AI提取成功: {publication.title}")
         
-        yield item
+        return item
+    
+    def _load_extraction_cache(self) -> OrderedDict:
+        """加载上次运行保存的提取结果缓存"""
+        cache = OrderedDict()
+        
+        if not _EXTRACTION_CACHE_FILE.exists():
+            return cache
+        
+        try:
+            with open(_EXTRACTION_CACHE_FILE, 'r', encoding='utf-8') as f:
+                for fingerprint, data in json.load(f).items():
+                    cache[fingerprint] = Publication.model_validate(data)
+            self.logger.info(f"已加载 {len(cache)} 条AI提取缓存")
+        except Exception as e:
+            self.logger.warning(f"加载AI提取缓存失败: {e}")
+        
+        return cache
+    
+    def _save_extraction_cache(self):
+        """保存提取结果缓存,供下次运行复用"""
+        try:
+            _EXTRACTION_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(_EXTRACTION_CACHE_FILE, 'w', encoding='utf-8') as f:
+                json.dump(
+                    {fp: pub.model_dump() for fp, pub in self._extraction_cache.items()},
+                    f,
+                    ensure_ascii=False
+                )
+        except Exception as e:
+            self.logger.error(f"保存AI提取缓存失败: {e}")
+    
+    def closed(self, reason: str):
+        """Spider关闭时持久化提取缓存并停止LLM线程池"""
+        self._save_extraction_cache()
+        self._llm_pool.stop()
+        super().closed(reason)
+    
+    def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        """
+        按token数截断文本
+        
+        LLM按token计费和限流,按token截断可以避免超量或截断不足。
+        未安装tiktoken时退回到按字符截断。
+        """
+        encoding = _get_token_encoding()
+        if encoding is None:
+            return text[:_MAX_INPUT_CHARS]
+        
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
     
     def parse_with_fallback(self, response):
         """
@@ -151,20 +313,20 @@ class AIEnhancedSpider(BaseSpider):
         - 复杂页面用AI(准确、灵活)
         """
         # 先尝试传统方法
-        title = response.css('h1.title::text').get()
+        title = response.xpath(self._TITLE_TEXT_XPATH).get()
         
         if title:
             # 传统方法成功
             item = {
                 'title': title,
-                'authors': response.css('.author::text').getall(),
+                'authors': response.xpath(self._AUTHOR_TEXT_XPATH).getall(),
                 'extraction_method': 'traditional'
             }
-            yield item
-        else:
-            # 传统方法失败,使用AI
-            self.logger.info("传统方法失败,切换到AI提取")
-            yield from self.parse_detail_page(response)
+            return [item]
+        
+        # 传统方法失败,使用AI
+        self.logger.info("传统方法失败,切换到AI提取")
+        return self.parse_detail_page(response)
     
     def parse_comments_with_ai(self, response):
         """
@@ -177,29 +339,34 @@ class AIEnhancedSpider(BaseSpider):
         
         AI可以理解这些复杂结构
         """
-        # 定义评论模型
-        class Comment(BaseModel):
-            author: str = Field(description="评论者姓名")
-            content: str = Field(description="评论内容")
-            date: Optional[str] = Field(default=None, description="评论日期")
-            replies: List['Comment'] = Field(default_factory=list, description="回复列表")
-        
         # 提取评论区文本
-        comments_section = response.css('.comments, #comments, .discussion').get()
+        comments_section = response.xpath(self._COMMENTS_XPATH)
         if not comments_section:
             self.logger.warning("未找到评论区")
-            return
+            return []
         
-        comments_text = scrapy.Selector(text=comments_section).css('::text').getall()
-        comments_text = ' '.join(comments_text)
+        comments_text = comments_section[0].xpath(self._TEXT_XPATH).getall()
+        comments_text = _WS_RE.sub(' ', ' '.join(comments_text)).strip()
         
-        # 使用AI提取
-        comments = self.ai_extractor.extract_list(
+        # 使用AI提取(在线程池中执行)
+        d = deferToThreadPool(
+            reactor,
+            self._llm_pool,
+            self.ai_extractor.extract_list,
             text=comments_text,
             item_schema=Comment,
             instruction="请提取所有评论,包括嵌套的回复。保持评论的层级结构。"
         )
-        
+        d.addCallbacks(
+            self._on_comments_extracted,
+            self._on_extraction_error,
+            callbackArgs=(response,),
+            errbackArgs=(response,)
+        )
+        return d
+    
+    def _on_comments_extracted(self, comments, response):
+        """评论提取完成后的回调"""
         self.logger.info(f"提取到 {len(comments)} 条评论")
         
         # 添加到item
@@ -207,7 +374,7 @@ class AIEnhancedSpider(BaseSpider):
         item['comments'] = [c.model_dump() for c in comments]
         item['comments_count'] = len(comments)
         
-        yield item
+        return [item]
 
 
 # 使用示例
@@ -225,15 +392,19 @@ class BioRxivAISpider(AIEnhancedSpider):
     allowed_domains = ["biorxiv.org"]
     start_urls = ["https://www.biorxiv.org/content/early/recent"]
     
+    _ARTICLE_LINKS_XPATH = _css_to_xpath(
+        '.highwire-article-citation a.highwire-cite-linked-title::attr(href)'
+    )
+    
     def parse(self, response):
         """解析列表页"""
         # 提取文章链接
-        article_links = response.css('.highwire-article-citation a.highwire-cite-linked-title::attr(href)').getall()
+        article_links = response.xpath(self._ARTICLE_LINKS_XPATH).getall()
         
         for link in article_links:
             yield response.follow(link, callback=self.parse_detail_page)
     
     def parse_detail_page(self, response):
         """使用AI提取文章详情"""
-        # 调用父类的AI提取方法
-        yield from super().parse_detail_page(response)
+        # 调用父类的AI提取方法(返回Deferred)
+        return super().parse_detail_page(response)
@@ -14,10 +14,85 @@ BioLINCC深度采集器
 import scrapy
 import json
 import re
+import sqlite3
+from pathlib import Path
 from urllib.parse import urljoin
 from datetime import datetime
+from lxml import etree
+from scrapy.selector import Selector, SelectorList
 from common.base_spider import BaseSpider
 
+try:
+    # 可选: 用Bloom过滤器代替set记录已下载文件URL(约10 bit/URL)
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+
+
+# 预编译的XPath(等价于原来的 section:contains("...") 等选择器)
+_CONSENT_SECTION_XP = etree.XPath(
+    'descendant-or-self::section[contains(., "Consent")]'
+)
+_DOC_SECTION_XP = etree.XPath(
+    'descendant-or-self::section[contains(., "Study Documents")]'
+    ' | descendant-or-self::div[contains(., "Study Documents")]'
+)
+_SECTION_BY_TITLE_XP = etree.XPath(
+    '//h2[contains(text(), $title)]/following-sibling::*[1]'
+)
+
+# 与BiolinccSpider共用的下载槽位(同一进程内合并对nhlbi.nih.gov的限流)
+NHLBI_DOWNLOAD_SLOT = 'nhlbi'
+
+# 已解析出版物的持久化缓存(按DOI/PMID索引)
+_PUB_CACHE_PATH = Path('data/cache/biolincc_publications.sqlite')
+
+# 断点续采: 已完成(详情+出版物)的研究ID,每行一个
+_CHECKPOINT_PATH = Path('data/cache/biolincc_deep_checkpoint.txt')
+
+# 预编译的正则表达式
+_FMT_RE = re.compile(r'\((\w+)\s*-\s*([\d.]+)\s*(\w+)\)')  # 例如: "(PDF - 52.5 MB)"
+_PARENS_RE = re.compile(r'\s*\([^)]+\)')
+_YEAR_RE = re.compile(r'\d{4}')
+_DIGITS_RE = re.compile(r'(\d+)')
+
+# 文档类型判定规则: 小写标题包含全部关键子串即命中,按顺序取第一条
+_DOC_TYPE_RULES = (
+    (('data dictionary', 'ancillary'), 'data_dictionary_ancillary'),
+    (('data dictionary',), 'data_dictionary'),
+    (('documentation',), 'data_documentation'),
+    (('manual',), 'manual'),
+    (('protocol',), 'protocol'),
+)
+
+
+# BioLINCC的<dt>标签基本是固定词表: 预先映射到字段名,未知标签首次出现时规范化并缓存
+_DT_MAP = {
+    label: label.lower().replace(' ', '_')
+    for label in (
+        'Accession Number', 'Study Type', 'Study Period', 'Collection Type',
+        'Dates', 'Network', 'Clinical Trial URLs', 'Primary Publication URLs',
+        'Study Website', 'Keywords', 'Specimen Types', 'Consent Type',
+        'Commercial Use Data Restrictions', 'Commercial Use Specimen Restrictions',
+        'Data Restrictions', 'Specimen Restrictions',
+    )
+}
+
+
+def _dt_field_name(label: str) -> str:
+    """将<dt>文本映射为字段名(已知标签直接查表)"""
+    field_name = _DT_MAP.get(label)
+    if field_name is None:
+        field_name = _DT_MAP[label] = label.strip().lower().replace(' ', '_')
+    return field_name
+
+
+def _select(xpath: etree.XPath, response, **variables) -> SelectorList:
+    """在响应的lxml树上执行预编译XPath,结果包装为SelectorList"""
+    return SelectorList(
+        Selector(root=node) for node in xpath(response.selector.root, **variables)
+    )
+
 
 class BiolinccDeepSpider(BaseSpider):
     """BioLINCC深度采集器"""
@@ -28,12 +103,31 @@ class BiolinccDeepSpider(BaseSpider):
     # 自定义设置
     custom_settings = {
         'CONCURRENT_REQUESTS': 4,  # 降低并发，避免封禁
-        'DOWNLOAD_DELAY': 2,  # 增加延迟
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 2,  # 作用于共享的nhlbi槽位
+        'DOWNLOAD_DELAY': 2,  # AutoThrottle的最小延迟
+        'RANDOMIZE_DOWNLOAD_DELAY': True,
+        # 根据服务器响应延迟自动调节请求间隔,替代固定的DOWNLOAD_DELAY
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 1,
+        'AUTOTHROTTLE_MAX_DELAY': 30,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        'RETRY_HTTP_CODES': [429, 500, 502, 503, 504, 522, 524, 408],
+        'DOWNLOADER_MIDDLEWARES': {
+            # 429时按Retry-After退避
+            'common.middleware.rate_limit.RetryAfterMiddleware': 560,
+            # 多进程共享限流(设置REDIS_THROTTLE_URL后启用)
+            'common.middleware.rate_limit.RedisTokenBucketMiddleware': 590,
+        },
         'ITEM_PIPELINES': {
             # Pipelines暂时禁用，直接输出到文件
             # 'common.pipeline.data_pipeline.DataPipeline': 300,
         },
         'FILES_STORE': './data/files/biolincc',
+        # HTTP缓存: 增量运行时未变化的页面不再重新下载
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.RFC2616Policy',
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_EXPIRATION_SECS': 604800,  # 7天
     }
     
     def __init__(self, max_studies=None, *args, **kwargs):
@@ -47,19 +141,46 @@ class BiolinccDeepSpider(BaseSpider):
         self.max_studies = int(max_studies) if max_studies else None
         self.studies_count = 0
         
+        # 已加入下载队列的文件URL(跨研究共享的文档只下载一次)
+        # 安装了pybloom_live时使用Bloom过滤器限制内存,误判率1e-4(极少数文档被跳过)
+        if ScalableBloomFilter is not None:
+            self._seen_files = ScalableBloomFilter(initial_capacity=100_000, error_rate=1e-4)
+        else:
+            self._seen_files = set()
+        
+        # 出版物缓存(跨运行复用)
+        _PUB_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self._pub_cache = sqlite3.connect(_PUB_CACHE_PATH)
+        self._pub_cache.execute(
+            'CREATE TABLE IF NOT EXISTS pub (key TEXT PRIMARY KEY, json TEXT)'
+        )
+        
+        # 已完成的研究,重新运行时跳过
+        self._done = set()
+        if _CHECKPOINT_PATH.exists():
+            self._done = set(_CHECKPOINT_PATH.read_text(encoding='utf-8').split())
+    
+    def closed(self, reason):
+        """关闭出版物缓存"""
+        self._pub_cache.commit()
+        self._pub_cache.close()
+        super().closed(reason)
+    
     def start_requests(self):
         """开始爬取：从研究列表页开始"""
         # 第1层：研究列表页
         list_url = 'https://biolincc.nhlbi.nih.gov/studies/'
         
         self.logger.info(f"开始采集BioLINCC平台")
+        if self._done:
+            self.logger.info(f"断点续采：跳过已完成的{len(self._done)}个研究")
         if self.max_studies:
             self.logger.info(f"测试模式：限制采集{self.max_studies}个研究")
         
         yield scrapy.Request(
             url=list_url,
             callback=self.parse_study_list,
-            meta={'playwright': False}  # 不需要浏览器渲染
+            meta={'playwright': False, 'download_slot': NHLBI_DOWNLOAD_SLOT}  # 不需要浏览器渲染
         )
     
     def parse_study_list(self, response):
@@ -78,14 +199,17 @@ class BiolinccDeepSpider(BaseSpider):
                 self.logger.info(f"已达到限制数量 {self.max_studies}，停止采集")
                 return
             
-            self.studies_count += 1
             study_url = response.urljoin(link)
+            if study_url.rstrip('/').split('/')[-1] in self._done:
+                continue
+            
+            self.studies_count += 1
             
             # 第2层：进入研究详情页
             yield scrapy.Request(
                 url=study_url,
                 callback=self.parse_study_detail,
-                meta={'playwright': False}
+                meta={'playwright': False, 'download_slot': NHLBI_DOWNLOAD_SLOT}
             )
     
     def parse_study_detail(self, response):
@@ -124,10 +248,11 @@ class BiolinccDeepSpider(BaseSpider):
             'files': [],
         }
         
-        # 准备文件下载
-        for doc in item['documents']:
-            if doc.get('url'):
-                item['file_urls'].append(doc['url'])
+        # 准备文件下载: 页面内去重(保持顺序),并跳过其他研究已下载的文件
+        for url in dict.fromkeys(doc['url'] for doc in item['documents'] if doc.get('url')):
+            if url not in self._seen_files:
+                self._seen_files.add(url)
+                item['file_urls'].append(url)
         
         # 输出当前研究的数据
         yield item
@@ -139,7 +264,8 @@ class BiolinccDeepSpider(BaseSpider):
             callback=self.parse_publications,
             meta={
                 'study_id': study_id,
-                'track_id': item['track_id']
+                'track_id': item['track_id'],
+                'download_slot': NHLBI_DOWNLOAD_SLOT,
             }
         )
     
@@ -153,11 +279,7 @@ class BiolinccDeepSpider(BaseSpider):
         # 提取所有元数据字段
         meta_fields = response.css('dl')
         if meta_fields:
-            for dt, dd in zip(
-                meta_fields.css('dt::text').getall(),
-                meta_fields.css('dd')
-            ):
-                field_name = dt.strip().lower().replace(' ', '_')
+            for field_name, dd in self._iter_dl_pairs(meta_fields.xpath('./dt | ./dd')):
                 field_value = dd.css('::text').get('').strip()
                 
                 # 处理链接
@@ -170,19 +292,32 @@ class BiolinccDeepSpider(BaseSpider):
         
         return info
     
+    def _iter_dl_pairs(self, nodes):
+        """
+        将文档顺序的dt/dd节点配对
+        
+        一次XPath遍历同时取回dt和dd,而不是分别查询后再zip。
+        
+        Yields:
+            (字段名, dd选择器)
+        """
+        field_name = None
+        for node in nodes:
+            if node.root.tag == 'dt':
+                field_name = _dt_field_name(node.xpath('text()').get(''))
+            elif field_name is not None:
+                yield field_name, node
+                field_name = None
+    
     def _extract_consent_info(self, response):
         """提取同意书信息"""
         consent = {}
         
-        consent_section = response.css('section:contains("Consent")')
+        consent_section = _select(_CONSENT_SECTION_XP, response)
         if consent_section:
             # 提取所有同意书相关字段
-            for dt, dd in zip(
-                consent_section.css('dt::text').getall(),
-                consent_section.css('dd::text').getall()
-            ):
-                field_name = dt.strip().lower().replace(' ', '_')
-                consent[field_name] = dd.strip()
+            for field_name, dd in self._iter_dl_pairs(consent_section.xpath('.//dt | .//dd')):
+                consent[field_name] = dd.xpath('text()').get('').strip()
             
             # 提取具体限制
             restrictions = consent_section.css('p::text').get()
@@ -194,9 +329,7 @@ class BiolinccDeepSpider(BaseSpider):
     def _extract_section_text(self, response, section_title):
         """提取指定章节的完整文本"""
         # 查找包含标题的section或div
-        section = response.xpath(
-            f'//h2[contains(text(), "{section_title}")]/following-sibling::*[1]'
-        )
+        section = _select(_SECTION_BY_TITLE_XP, response, title=section_title)
         
         if section:
             # 提取所有文本，保留段落结构
@@ -211,7 +344,7 @@ class BiolinccDeepSpider(BaseSpider):
         documents = []
         
         # 查找"Study Documents"部分
-        doc_section = response.css('section:contains("Study Documents"), div:contains("Study Documents")')
+        doc_section = _select(_DOC_SECTION_XP, response)
         
         if doc_section:
             doc_links = doc_section.css('a')
@@ -222,11 +355,11 @@ class BiolinccDeepSpider(BaseSpider):
                 
                 # 从标题中提取文件信息
                 # 例如: "Data Dictionary (PDF - 52.5 MB)"
-                format_match = re.search(r'\((\w+)\s*-\s*([\d.]+)\s*(\w+)\)', title)
+                format_match = _FMT_RE.search(title)
                 
                 doc = {
                     'type': self._classify_document_type(title),
-                    'title': re.sub(r'\s*\([^)]+\)', '', title).strip(),  # 移除括号内容
+                    'title': _PARENS_RE.sub('', title).strip(),  # 移除括号内容
                     'url': url,
                     'file_type': 'supplementary',  # 归类为补充材料
                     'filename': f'sup_{idx}.pdf',  # 标准化文件名
@@ -245,18 +378,66 @@ class BiolinccDeepSpider(BaseSpider):
         """根据标题分类文档类型"""
         title_lower = title.lower()
         
-        if 'data dictionary' in title_lower:
-            if 'ancillary' in title_lower:
-                return 'data_dictionary_ancillary'
-            return 'data_dictionary'
-        elif 'documentation' in title_lower:
-            return 'data_documentation'
-        elif 'manual' in title_lower:
-            return 'manual'
-        elif 'protocol' in title_lower:
-            return 'protocol'
-        else:
-            return 'other'
+        for keywords, doc_type in _DOC_TYPE_RULES:
+            if all(keyword in title_lower for keyword in keywords):
+                return doc_type
+        return 'other'
+    
+    def _parse_publication_row(self, row):
+        """解析单条出版物,已缓存的DOI/PMID直接复用之前的解析结果"""
+        # 先提取标识符,用于查询缓存
+        pmid = None
+        pmid_link = row.css('a[href*="pubmed"]::attr(href)').get()
+        if pmid_link:
+            pmid_match = _DIGITS_RE.search(pmid_link)
+            if pmid_match:
+                pmid = pmid_match.group(1)
+        
+        doi = None
+        doi_link = row.css('a[href*="doi.org"]::attr(href)').get()
+        if doi_link:
+            doi = doi_link.replace('https://doi.org/', '')
+        
+        cache_key = doi or (f'pmid:{pmid}' if pmid else None)
+        if cache_key:
+            cached = self._pub_cache.execute(
+                'SELECT json FROM pub WHERE key = ?', (cache_key,)
+            ).fetchone()
+            if cached:
+                return json.loads(cached[0])
+        
+        pub = {}
+        
+        # 提取标题
+        pub['title'] = row.css('a::text, strong::text').get('').strip()
+        
+        # 提取作者
+        authors_text = row.css('.authors::text, em::text').get()
+        if authors_text:
+            pub['authors'] = [a.strip() for a in authors_text.split(',')]
+        
+        # 提取期刊和年份
+        journal_text = row.css('.journal::text').get()
+        if journal_text:
+            pub['journal'] = journal_text.strip()
+        
+        year_text = row.css('.year::text').get()
+        if year_text:
+            pub['year'] = int(_YEAR_RE.search(year_text).group())
+        
+        # PMID和DOI
+        if pmid:
+            pub['pmid'] = pmid
+        if doi:
+            pub['doi'] = doi
+        
+        if cache_key and pub.get('title'):
+            self._pub_cache.execute(
+                'INSERT OR REPLACE INTO pub (key, json) VALUES (?, ?)',
+                (cache_key, json.dumps(pub, ensure_ascii=False))
+            )
+        
+        return pub
     
     def parse_publications(self, response):
         """解析出版物列表页"""
@@ -272,40 +453,12 @@ class BiolinccDeepSpider(BaseSpider):
         pub_rows = response.css('table tbody tr, ul.publications li')
         
         for row in pub_rows:
-            pub = {}
-            
-            # 提取标题
-            pub['title'] = row.css('a::text, strong::text').get('').strip()
-            
-            # 提取作者
-            authors_text = row.css('.authors::text, em::text').get()
-            if authors_text:
-                pub['authors'] = [a.strip() for a in authors_text.split(',')]
-            
-            # 提取期刊和年份
-            journal_text = row.css('.journal::text').get()
-            if journal_text:
-                pub['journal'] = journal_text.strip()
-            
-            year_text = row.css('.year::text').get()
-            if year_text:
-                pub['year'] = int(re.search(r'\d{4}', year_text).group())
-            
-            # 提取PMID
-            pmid_link = row.css('a[href*="pubmed"]::attr(href)').get()
-            if pmid_link:
-                pmid_match = re.search(r'(\d+)', pmid_link)
-                if pmid_match:
-                    pub['pmid'] = pmid_match.group(1)
-            
-            # 提取DOI
-            doi_link = row.css('a[href*="doi.org"]::attr(href)').get()
-            if doi_link:
-                pub['doi'] = doi_link.replace('https://doi.org/', '')
-            
+            pub = self._parse_publication_row(row)
             if pub.get('title'):
                 publications.append(pub)
         
+        self._pub_cache.commit()
+        
         # 输出出版物数据
         if publications:
             yield {
@@ -321,3 +474,8 @@ class BiolinccDeepSpider(BaseSpider):
             self.logger.info(f"研究 {study_id} 找到 {len(publications)} 篇出版物")
         else:
             self.logger.warning(f"研究 {study_id} 没有找到出版物")
+        
+        # 详情和出版物均已输出,记录检查点
+        self._done.add(study_id)
+        with open(_CHECKPOINT_PATH, 'a', encoding='utf-8') as f:
+            f.write(study_id + '\n')
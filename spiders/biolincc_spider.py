@@ -12,6 +12,7 @@ from typing import Iterator, Dict, Any
 from scrapy.http import Response, Request
 import sys
 from pathlib import Path
+from lxml.etree import XPath
 
 # Add parent directory to path to import common modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -19,6 +20,46 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from common.base_spider import BaseSpider
 
 
+def _class_xpath(tag: str, css_class: str, tail: str = '') -> XPath:
+    """Compile the XPath equivalent of the CSS selector ``tag.css_class`` plus tail."""
+    return XPath(
+        f'descendant-or-self::{tag}'
+        f'[contains(concat(" ", normalize-space(@class), " "), " {css_class} ")]{tail}',
+        smart_strings=False,
+    )
+
+
+# Precompiled publication XPaths, evaluated directly on lxml elements
+_PUB_ITEM_XP = _class_xpath('div', 'publication-item')
+_PUB_FIELD_XPS = {
+    'title': _class_xpath('h4', 'pub-title', '/text()'),
+    'authors': _class_xpath('div', 'pub-authors', '/text()'),
+    'journal': _class_xpath('span', 'pub-journal', '/text()'),
+    'year': _class_xpath('span', 'pub-year', '/text()'),
+    'pmid': _class_xpath('span', 'pmid', '/text()'),
+    'doi': _class_xpath('a', 'doi', '/@href'),
+}
+
+# Precompiled single-value study fields: field -> XPath (first match is used)
+_DETAIL_TEXT_XPS = {
+    'title': _class_xpath('h1', 'study-title', '/text()'),
+    'study_id': _class_xpath('div', 'study-id', '/text()'),
+    'acronym': _class_xpath('div', 'acronym', '/text()'),
+    'study_type': _class_xpath('div', 'study-type', '/text()'),
+    'study_design': _class_xpath('div', 'study-design', '/text()'),
+    'principal_investigator': _class_xpath('div', 'pi-name', '/text()'),
+    'start_date': _class_xpath('span', 'start-date', '/text()'),
+    'end_date': _class_xpath('span', 'end-date', '/text()'),
+    'enrollment': _class_xpath('span', 'enrollment', '/text()'),
+    'age_range': _class_xpath('span', 'age-range', '/text()'),
+    'gender': _class_xpath('span', 'gender', '/text()'),
+    'data_available': _class_xpath('div', 'data-availability', '/text()'),
+    'contact_email': _class_xpath('a', 'contact-email', '/@href'),
+    'contact_phone': _class_xpath('span', 'contact-phone', '/text()'),
+    'sponsor': _class_xpath('div', 'sponsor', '/text()'),
+}
+
+
 class BiolinccSpider(BaseSpider):
     """
     Spider for BioLINCC platform.
@@ -36,9 +77,19 @@ class BiolinccSpider(BaseSpider):
     
     custom_settings = {
         **BaseSpider.custom_settings,
-        'DOWNLOAD_DELAY': 3,  # Be respectful to government servers
+        'DOWNLOAD_DELAY': 2,  # Be respectful to government servers
+        'RANDOMIZE_DOWNLOAD_DELAY': True,
+        # Applies to the shared 'nhlbi' slot used by both BioLINCC spiders
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 2,
+        'DOWNLOADER_MIDDLEWARES': {
+            # Cross-process throttling, enabled when REDIS_THROTTLE_URL is set
+            'common.middleware.rate_limit.RedisTokenBucketMiddleware': 590,
+        },
     }
     
+    # Download slot shared with BiolinccDeepSpider so both throttle as one
+    download_slot = 'nhlbi'
+    
     def __init__(self, *args, **kwargs):
         # Platform configuration
         platform_config = {
@@ -50,6 +101,12 @@ class BiolinccSpider(BaseSpider):
         
         super().__init__(platform_config=platform_config, *args, **kwargs)
     
+    def start_requests(self) -> Iterator[Request]:
+        """Generate initial requests on the shared download slot."""
+        for request in super().start_requests():
+            request.meta['download_slot'] = self.download_slot
+            yield request
+    
     def parse_list_page(self, response: Response) -> Iterator[Request]:
         """
         Parse the studies list page to extract study detail URLs.
@@ -80,7 +137,7 @@ class BiolinccSpider(BaseSpider):
                 url=study_url,
                 callback=self.parse_detail_page,
                 errback=self.handle_error,
-                meta={'platform': self.platform_name}
+                meta={'platform': self.platform_name, 'download_slot': self.download_slot}
             )
             
             self.stats['pages_scraped'] += 1
@@ -91,7 +148,8 @@ class BiolinccSpider(BaseSpider):
             yield scrapy.Request(
                 url=response.urljoin(next_page),
                 callback=self.parse_list_page,
-                errback=self.handle_error
+                errback=self.handle_error,
+                meta={'download_slot': self.download_slot}
             )
     
     def parse_detail_page(self, response: Response) -> Dict[str, Any]:
@@ -108,13 +166,14 @@ class BiolinccSpider(BaseSpider):
         
         # Extract common metadata
         item = self.extract_common_metadata(response)
+        root = response.selector.root
         
         # Extract study-specific fields
         item.update({
             # Basic information
-            'title': self.clean_text(response.css('h1.study-title::text').get()),
-            'study_id': self.clean_text(response.css('div.study-id::text').get()),
-            'acronym': self.clean_text(response.css('div.acronym::text').get()),
+            'title': self._txt(root, _DETAIL_TEXT_XPS['title']),
+            'study_id': self._txt(root, _DETAIL_TEXT_XPS['study_id']),
+            'acronym': self._txt(root, _DETAIL_TEXT_XPS['acronym']),
             
             # Description
             'description': self.clean_text(
@@ -125,30 +184,26 @@ class BiolinccSpider(BaseSpider):
             ),
             
             # Study design
-            'study_type': self.clean_text(response.css('div.study-type::text').get()),
-            'study_design': self.clean_text(response.css('div.study-design::text').get()),
+            'study_type': self._txt(root, _DETAIL_TEXT_XPS['study_type']),
+            'study_design': self._txt(root, _DETAIL_TEXT_XPS['study_design']),
             'condition': response.css('div.condition span::text').getall(),
             'intervention': response.css('div.intervention span::text').getall(),
             
             # Investigators
-            'principal_investigator': self.clean_text(
-                response.css('div.pi-name::text').get()
-            ),
+            'principal_investigator': self._txt(root, _DETAIL_TEXT_XPS['principal_investigator']),
             'investigators': response.css('div.investigators li::text').getall(),
             
             # Dates
-            'start_date': self.clean_text(response.css('span.start-date::text').get()),
-            'end_date': self.clean_text(response.css('span.end-date::text').get()),
+            'start_date': self._txt(root, _DETAIL_TEXT_XPS['start_date']),
+            'end_date': self._txt(root, _DETAIL_TEXT_XPS['end_date']),
             
             # Participants
-            'enrollment': self.clean_text(response.css('span.enrollment::text').get()),
-            'age_range': self.clean_text(response.css('span.age-range::text').get()),
-            'gender': self.clean_text(response.css('span.gender::text').get()),
+            'enrollment': self._txt(root, _DETAIL_TEXT_XPS['enrollment']),
+            'age_range': self._txt(root, _DETAIL_TEXT_XPS['age_range']),
+            'gender': self._txt(root, _DETAIL_TEXT_XPS['gender']),
             
             # Data availability
-            'data_available': self.clean_text(
-                response.css('div.data-availability::text').get()
-            ),
+            'data_available': self._txt(root, _DETAIL_TEXT_XPS['data_available']),
             'access_criteria': self.clean_text(
                 ' '.join(response.css('div.access-criteria *::text').getall())
             ),
@@ -157,14 +212,12 @@ class BiolinccSpider(BaseSpider):
             'publications': self._extract_publications(response),
             
             # Contact
-            'contact_email': self.clean_text(
-                response.css('a.contact-email::attr(href)').get()
-            ),
-            'contact_phone': self.clean_text(response.css('span.contact-phone::text').get()),
+            'contact_email': self._txt(root, _DETAIL_TEXT_XPS['contact_email']),
+            'contact_phone': self._txt(root, _DETAIL_TEXT_XPS['contact_phone']),
             
             # Additional metadata
             'keywords': response.css('div.keywords span::text').getall(),
-            'sponsor': self.clean_text(response.css('div.sponsor::text').get()),
+            'sponsor': self._txt(root, _DETAIL_TEXT_XPS['sponsor']),
         })
         
         self.stats['items_extracted'] += 1
@@ -183,16 +236,10 @@ class BiolinccSpider(BaseSpider):
         """
         publications = []
         
-        for pub in response.css('div.publication-item'):
-            publication = {
-                'title': self.clean_text(pub.css('h4.pub-title::text').get()),
-                'authors': self.clean_text(pub.css('div.pub-authors::text').get()),
-                'journal': self.clean_text(pub.css('span.pub-journal::text').get()),
-                'year': self.clean_text(pub.css('span.pub-year::text').get()),
-                'pmid': self.clean_text(pub.css('span.pmid::text').get()),
-                'doi': self.clean_text(pub.css('a.doi::attr(href)').get()),
-            }
-            publications.append(publication)
+        for pub in _PUB_ITEM_XP(response.selector.root):
+            publications.append({
+                field: self._txt(pub, xpath) for field, xpath in _PUB_FIELD_XPS.items()
+            })
         
         return publications
 
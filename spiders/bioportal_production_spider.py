@@ -10,13 +10,69 @@ BioPortal Production Spider
 """
 
 import scrapy
-import json
 import csv
+import io
+import json
+import ijson
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List
 import logging
+from w3lib.url import add_or_replace_parameter
+
+
+# 类数据的Parquet schema(properties以JSON字符串存储)
+CLASS_SCHEMA = pa.schema([
+    ('ontology', pa.string()),
+    ('id', pa.string()),
+    ('prefLabel', pa.string()),
+    ('definition', pa.list_(pa.string())),
+    ('synonym', pa.list_(pa.string())),
+    ('parents', pa.list_(pa.string())),
+    ('children', pa.list_(pa.string())),
+    ('properties', pa.string()),
+    ('collected_at', pa.string()),
+])
+
+
+# 流式解析类分页时每批写入的类数量
+CLASS_BATCH_SIZE = 500
+
+
+def _read_page_info(body: bytes):
+    """流式读取分页信息(pageCount, nextPage),返回 (是否顶层数组, pageCount, nextPage)
+
+    BioPortal的分页字段位于collection之前,读到collection即可停止,不解析类数据本身。
+    """
+    page_count, next_page = 0, None
+    seen_links = False
+    for prefix, event, value in ijson.parse(io.BytesIO(body)):
+        if prefix == '' and event == 'start_array':
+            return True, 0, None
+        if prefix == 'pageCount' and event == 'number':
+            page_count = int(value)
+        elif prefix == 'links.nextPage' and event == 'string':
+            next_page = value
+        elif prefix == 'links' and event == 'end_map':
+            seen_links = True
+        elif prefix == 'collection' and event == 'start_array' and seen_links:
+            break
+    return False, page_count, next_page
+
+
+def _as_str_list(value) -> List[str]:
+    """将API返回的字段规范为字符串列表(非字符串元素按JSON编码)"""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [v if isinstance(v, str) else orjson.dumps(v).decode('utf-8') for v in value]
 
 
 class BioportalProductionSpider(scrapy.Spider):
@@ -33,7 +89,26 @@ class BioportalProductionSpider(scrapy.Spider):
     
     custom_settings = {
         'CONCURRENT_REQUESTS': 4,  # 限制并发请求数
-        'DOWNLOAD_DELAY': 1,  # 请求间延迟1秒
+        # 根据API响应延迟自动调节请求间隔,替代固定的DOWNLOAD_DELAY
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 1,
+        'AUTOTHROTTLE_MAX_DELAY': 30,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        'RETRY_HTTP_CODES': [429, 500, 502, 503, 504, 522, 524, 408],
+        'DOWNLOADER_MIDDLEWARES': {
+            # 429时按Retry-After退避
+            'common.middleware.rate_limit.RetryAfterMiddleware': 560,
+        },
+        # HTTP/2: 同一本体的多页类数据复用一个TLS连接并多路复用
+        'DOWNLOAD_HANDLERS': {
+            'https': 'scrapy.core.downloader.handlers.http2.H2DownloadHandler',
+        },
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,
+        # HTTP缓存: 增量运行时未变化的本体元数据不再重新下载
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.RFC2616Policy',
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_EXPIRATION_SECS': 604800,  # 7天
         'ROBOTSTXT_OBEY': False,  # API不需要遵守robots.txt
         'USER_AGENT': 'BiomedicalDataScraper/1.0 (Research Project)',
         'DEFAULT_REQUEST_HEADERS': {
@@ -42,6 +117,19 @@ class BioportalProductionSpider(scrapy.Spider):
         }
     }
     
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        
+        # API Key通过Authorization头发送,URL中不再携带apikey参数,
+        # 请求去重和HTTP缓存按规范URL生效,日志中也不会暴露Key。
+        # (Scrapy 2.11起from_crawler中设置尚未冻结,可以修改)
+        headers = dict(crawler.settings.getdict('DEFAULT_REQUEST_HEADERS'))
+        headers['Authorization'] = f"apikey token={spider.api_key}"
+        crawler.settings.set('DEFAULT_REQUEST_HEADERS', headers, priority='spider')
+        
+        return spider
+    
     def __init__(self, api_key=None, limit_ontologies=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
@@ -74,14 +162,36 @@ class BioportalProductionSpider(scrapy.Spider):
         # 用于存储元数据的列表
         self.ontologies_metadata = []
         
+        # 每个本体一个Parquet writer,在closed()中关闭
+        # 每次运行写入一个新分片: 先写classes/{acronym}/{run_id}.parquet.part,
+        # 本体全部分页完成后才重命名为.parquet
+        self._pq_writers: Dict[str, pq.ParquetWriter] = {}
+        self._run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
+        # 后台写文件线程,避免磁盘IO阻塞reactor(单线程保证写入顺序)
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bioportal-io')
+        
+        # 断点续采: 已完整采集类数据的本体,重新运行时跳过
+        self._checkpoint_path = self.data_dir / 'checkpoint.txt'
+        self._done = set()
+        if self._checkpoint_path.exists():
+            self._done = set(self._checkpoint_path.read_text(encoding='utf-8').split())
+        self._remove_incomplete_shards()
+        # 已调度但尚未返回的类分页数(按本体)
+        self._pending_pages: Dict[str, int] = {}
+        # 有分页失败的本体: 本次不记入检查点,分片丢弃,下次运行重新采集
+        self._failed = set()
+        
         self.logger.info(f"BioPortal Production Spider initialized")
         self.logger.info(f"Data directory: {self.data_dir.absolute()}")
         if self.limit_ontologies:
             self.logger.info(f"Limiting to {self.limit_ontologies} ontologies for testing")
+        if self._done:
+            self.logger.info(f"Resuming: {len(self._done)} ontologies already completed")
     
     def start_requests(self):
         """开始采集：获取所有本体列表"""
-        url = f"{self.API_BASE}/ontologies?apikey={self.api_key}&display=all"
+        url = f"{self.API_BASE}/ontologies?display=all"
         
         self.logger.info(f"Fetching ontologies list from {url}")
         yield scrapy.Request(
@@ -109,7 +219,8 @@ class BioportalProductionSpider(scrapy.Spider):
                 ontologies = ontologies[:self.limit_ontologies]
                 self.logger.info(f"Limited to {len(ontologies)} ontologies for testing")
             
-            # 处理每个本体
+            # 处理每个本体(同一批次共用一个采集时间戳)
+            collected_at = datetime.now().isoformat()
             for idx, ontology in enumerate(ontologies, 1):
                 acronym = ontology.get('acronym')
                 name = ontology.get('name', 'Unknown')
@@ -117,14 +228,28 @@ class BioportalProductionSpider(scrapy.Spider):
                 self.logger.info(f"[{idx}/{len(ontologies)}] Processing: {acronym} - {name}")
                 
                 # 保存元数据
-                metadata = self._extract_ontology_metadata(ontology)
+                metadata = self._extract_ontology_metadata(ontology, collected_at)
                 self.ontologies_metadata.append(metadata)
                 self.stats['ontologies_count'] += 1
                 
-                # 获取该本体的详细信息
+                if acronym in self._done:
+                    # 之前的运行已完成该本体的类数据
+                    continue
+                
                 links = ontology.get('links', {})
-                if isinstance(links, dict) and 'self' in links:
-                    detail_url = links['self'] + f"?apikey={self.api_key}"
+                if not isinstance(links, dict):
+                    continue
+                
+                if links.get('classes'):
+                    # 列表已包含类数据链接: 直接获取类数据,省去一次详情请求
+                    yield scrapy.Request(
+                        url=links['classes'],
+                        callback=self.parse_classes,
+                        meta={'acronym': acronym}
+                    )
+                elif 'self' in links:
+                    # 否则先获取该本体的详细信息
+                    detail_url = links['self']
                     yield scrapy.Request(
                         url=detail_url,
                         callback=self.parse_ontology_details,
@@ -135,7 +260,7 @@ class BioportalProductionSpider(scrapy.Spider):
             self.logger.error(f"Failed to parse JSON: {e}")
             self.logger.error(f"Response text: {response.text[:500]}")
     
-    def _extract_ontology_metadata(self, ontology: Dict) -> Dict:
+    def _extract_ontology_metadata(self, ontology: Dict, collected_at: str = None) -> Dict:
         """提取本体元数据"""
         # 安全提取嵌套字段
         def safe_get_name(obj):
@@ -182,7 +307,7 @@ class BioportalProductionSpider(scrapy.Spider):
             'views': ontology.get('views', 0),
             'projects': ontology.get('projects', []),
             'api_url': ontology.get('links', {}).get('self') if isinstance(ontology.get('links'), dict) else None,
-            'collected_at': datetime.now().isoformat(),
+            'collected_at': collected_at or datetime.now().isoformat(),
         }
     
     def parse_ontology_details(self, response):
@@ -194,10 +319,11 @@ class BioportalProductionSpider(scrapy.Spider):
             
             # 获取类数据
             if data.get('links', {}).get('classes'):
-                classes_url = data['links']['classes'] + f"?apikey={self.api_key}"
+                classes_url = data['links']['classes']
                 yield scrapy.Request(
                     url=classes_url,
                     callback=self.parse_classes,
+                    errback=self._on_class_page_error,
                     meta={'acronym': acronym}
                 )
             
@@ -207,62 +333,209 @@ class BioportalProductionSpider(scrapy.Spider):
     def parse_classes(self, response):
         """解析类数据"""
         acronym = response.meta['acronym']
+        fanned_out = response.meta.get('fanned_out')
+        
+        if acronym in self._failed:
+            # 该本体已有分页失败,其余分页不再保存
+            if fanned_out:
+                self._page_returned(acronym)
+            return
         
         try:
-            data = json.loads(response.text)
-            
-            # 处理分页
-            if isinstance(data, dict):
-                classes = data.get('collection', [])
-                next_page = data.get('links', {}).get('nextPage')
-            else:
-                classes = data
-                next_page = None
+            # 流式解析: 只读取分页字段,类数据逐条构建并分批写入,不物化整个响应
+            is_list, page_count, next_page = _read_page_info(response.body)
             
-            if classes:
+            classes = ijson.items(
+                io.BytesIO(response.body),
+                'item' if is_list else 'collection.item',
+                use_float=True,
+            )
+            saved = 0
+            while True:
+                batch = list(islice(classes, CLASS_BATCH_SIZE))
+                if not batch:
+                    break
                 # 保存类数据
-                self._save_classes(acronym, classes)
-                self.stats['classes_count'] += len(classes)
-                self.logger.info(f"{acronym}: Saved {len(classes)} classes")
+                self._save_classes(acronym, batch)
+                saved += len(batch)
+            
+            if saved:
+                self.stats['classes_count'] += saved
+                self.logger.info(f"{acronym}: Saved {saved} classes")
             
-            # 处理下一页
-            if next_page:
+            if fanned_out:
+                # 后续页已在第一页时统一调度,最后一页返回后记录完成
+                self._page_returned(acronym)
+                return
+            
+            if page_count > 1:
+                # 已知总页数: 一次性调度剩余所有页,并发获取而非逐页串行
+                self._pending_pages[acronym] = page_count - 1
+                for page in range(2, page_count + 1):
+                    yield scrapy.Request(
+                        url=add_or_replace_parameter(response.url, 'page', str(page)),
+                        callback=self.parse_classes,
+                        errback=self._on_class_page_error,
+                        meta={'acronym': acronym, 'fanned_out': True}
+                    )
+            elif next_page:
+                # 处理下一页
                 yield scrapy.Request(
-                    url=next_page + f"&apikey={self.api_key}",
+                    url=next_page,
                     callback=self.parse_classes,
+                    errback=self._on_class_page_error,
                     meta={'acronym': acronym}
                 )
+            else:
+                self._mark_done(acronym)
             
-        except json.JSONDecodeError as e:
+        except ijson.JSONError as e:
             self.logger.error(f"Failed to parse classes for {acronym}: {e}")
+            self._class_page_failed(acronym, fanned_out)
     
-    def _save_classes(self, acronym: str, classes: List[Dict]):
-        """保存类数据到JSONL文件"""
+    def _on_class_page_error(self, failure):
+        """类分页请求重试后仍失败"""
+        request = failure.request
+        acronym = request.meta['acronym']
+        self.logger.error(f"Failed to fetch classes for {acronym}: {request.url} ({failure.value})")
+        self._class_page_failed(acronym, request.meta.get('fanned_out'))
+    
+    def _class_page_failed(self, acronym: str, fanned_out: bool):
+        """记录本体不完整并丢弃其分片;并发分页仍计入已返回页数"""
+        if acronym not in self._failed:
+            self._failed.add(acronym)
+            self.logger.error(f"{acronym}: class pages incomplete, not checkpointed (retried next run)")
+            self._io_pool.submit(self._discard_ontology, acronym)
+        
+        if fanned_out:
+            self._page_returned(acronym)
+    
+    def _page_returned(self, acronym: str):
+        """并发分页返回一页;全部返回且没有失败时记录完成"""
+        self._pending_pages[acronym] -= 1
+        if not self._pending_pages[acronym]:
+            del self._pending_pages[acronym]
+            if acronym not in self._failed:
+                self._mark_done(acronym)
+    
+    def _remove_incomplete_shards(self):
+        """
+        删除未完成的类数据分片
+        
+        上次运行中断时留下的.part文件(可能没有文件尾),以及不在检查点中的本体的
+        分片都会被删除: 这些本体本次会重新完整采集,避免同一本体出现部分+完整两份数据。
+        """
         classes_dir = self.data_dir / 'classes'
-        classes_dir.mkdir(exist_ok=True)
-        
-        file_path = classes_dir / f"{acronym}.jsonl"
-        
-        with open(file_path, 'a', encoding='utf-8') as f:
-            for cls in classes:
-                class_data = {
-                    'ontology': acronym,
-                    'id': cls.get('@id'),
-                    'prefLabel': cls.get('prefLabel'),
-                    'definition': cls.get('definition', []),
-                    'synonym': cls.get('synonym', []),
-                    'parents': cls.get('parents', []),
-                    'children': cls.get('children', []),
-                    'properties': cls.get('properties', {}),
-                    'collected_at': datetime.now().isoformat(),
-                }
-                f.write(json.dumps(class_data, ensure_ascii=False) + '\n')
+        if not classes_dir.exists():
+            return
+        
+        removed = 0
+        for shard_dir in classes_dir.iterdir():
+            if not shard_dir.is_dir():
+                continue
+            pattern = '*.part' if shard_dir.name in self._done else '*.parquet*'
+            for shard in shard_dir.glob(pattern):
+                shard.unlink()
+                removed += 1
+        
+        if removed:
+            self.logger.info(f"Removed {removed} incomplete class shards")
+    
+    def _shard_path(self, acronym: str) -> Path:
+        """本次运行的类数据分片路径(完成后的文件名)"""
+        return self.data_dir / 'classes' / acronym / f"{self._run_id}.parquet"
+    
+    def _part_path(self, acronym: str) -> Path:
+        """本次运行的类数据分片写入中的临时路径"""
+        return self.data_dir / 'classes' / acronym / f"{self._run_id}.parquet.part"
+    
+    def _get_class_writer(self, acronym: str) -> pq.ParquetWriter:
+        """获取本体的Parquet writer(每个本体只打开一次,写入.part临时文件)"""
+        writer = self._pq_writers.get(acronym)
+        if writer is None:
+            part_path = self._part_path(acronym)
+            part_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            writer = pq.ParquetWriter(
+                part_path,
+                CLASS_SCHEMA,
+                compression='snappy',
+                use_dictionary=True,
+            )
+            self._pq_writers[acronym] = writer
+        return writer
+    
+    def _save_classes(self, acronym: str, classes: List[Dict]):
+        """保存类数据到Parquet分片(在reactor线程构建batch,后台线程写入)"""
+        collected_at = datetime.now().isoformat()
+        
+        batch = pa.RecordBatch.from_pylist([
+            {
+                'ontology': acronym,
+                'id': cls.get('@id'),
+                'prefLabel': cls.get('prefLabel'),
+                'definition': _as_str_list(cls.get('definition')),
+                'synonym': _as_str_list(cls.get('synonym')),
+                'parents': _as_str_list(cls.get('parents')),
+                'children': _as_str_list(cls.get('children')),
+                'properties': orjson.dumps(cls.get('properties', {})).decode('utf-8'),
+                'collected_at': collected_at,
+            }
+            for cls in classes
+        ], schema=CLASS_SCHEMA)
+        
+        self._io_pool.submit(self._write_classes, acronym, batch)
+    
+    def _write_classes(self, acronym: str, batch: pa.RecordBatch):
+        """写入类数据(在后台IO线程中执行)"""
+        try:
+            self._get_class_writer(acronym).write_batch(batch)
+        except Exception as e:
+            self.logger.error(f"Failed to write classes for {acronym}: {e}")
+    
+    def _mark_done(self, acronym: str):
+        """本体的全部类分页已处理,加入检查点"""
+        self._done.add(acronym)
+        self._io_pool.submit(self._finish_ontology, acronym)
+    
+    def _finish_ontology(self, acronym: str):
+        """关闭本体的Parquet writer、发布分片并写入检查点(在后台IO线程中执行,排在该本体的写入之后)"""
+        try:
+            writer = self._pq_writers.pop(acronym, None)
+            if writer is not None:
+                writer.close()
+                os.replace(self._part_path(acronym), self._shard_path(acronym))
+            with open(self._checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write(acronym + '\n')
+        except Exception as e:
+            self.logger.error(f"Failed to checkpoint {acronym}: {e}")
+    
+    def _discard_ontology(self, acronym: str):
+        """关闭本体的Parquet writer并删除其.part分片(在后台IO线程中执行,排在该本体的写入之后)"""
+        try:
+            writer = self._pq_writers.pop(acronym, None)
+            if writer is not None:
+                writer.close()
+            self._part_path(acronym).unlink(missing_ok=True)
+        except Exception as e:
+            self.logger.error(f"Failed to discard classes for {acronym}: {e}")
+    
+    def _close_class_writers(self):
+        """关闭未完成本体的Parquet writer并删除其.part分片(下次运行重新采集)"""
+        for acronym, writer in self._pq_writers.items():
+            writer.close()
+            self._part_path(acronym).unlink(missing_ok=True)
+        self._pq_writers.clear()
     
     def closed(self, reason):
         """采集结束时的清理工作"""
         self.stats['end_time'] = datetime.now().isoformat()
         self.stats['reason'] = reason
         
+        # 等待后台写入完成,再关闭并丢弃未完成本体的分片
+        self._io_pool.shutdown(wait=True)
+        self._close_class_writers()
+        
         # 保存元数据
         self._save_metadata()
         
@@ -283,32 +556,29 @@ class BioportalProductionSpider(scrapy.Spider):
         
         # 保存JSONL
         jsonl_path = self.data_dir / 'metadata.jsonl'
-        with open(jsonl_path, 'w', encoding='utf-8') as f:
-            for item in self.ontologies_metadata:
-                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+        with open(jsonl_path, 'wb') as f:
+            f.writelines(orjson.dumps(item) + b'\n' for item in self.ontologies_metadata)
         
         self.logger.info(f"Saved metadata to {jsonl_path}")
         
         # 保存CSV
         csv_path = self.data_dir / 'metadata.csv'
-        if self.ontologies_metadata:
-            # 处理嵌套字段
-            flattened_data = []
-            for item in self.ontologies_metadata:
-                flat_item = item.copy()
-                # 将列表和字典转换为字符串
-                for key, value in flat_item.items():
-                    if isinstance(value, (list, dict)):
-                        flat_item[key] = json.dumps(value, ensure_ascii=False)
-                flattened_data.append(flat_item)
-            
-            keys = flattened_data[0].keys()
-            with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=keys)
-                writer.writeheader()
-                writer.writerows(flattened_data)
-            
-            self.logger.info(f"Saved metadata to {csv_path}")
+        
+        # 嵌套字段(列表/字典)编码为JSON字符串
+        def flatten(item: Dict) -> Dict:
+            return {
+                k: orjson.dumps(v).decode('utf-8') if isinstance(v, (list, dict)) else v
+                for k, v in item.items()
+            }
+        
+        # 单次遍历: 生成器逐行展开后写入,1MB写缓冲减少write调用
+        fieldnames = list(self.ontologies_metadata[0].keys())
+        with open(csv_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(flatten(item) for item in self.ontologies_metadata)
+        
+        self.logger.info(f"Saved metadata to {csv_path}")
     
     def _save_statistics(self):
         """保存统计信息"""
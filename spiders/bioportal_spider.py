@@ -7,10 +7,12 @@ URL: https://bioportal.bioontology.org
 This spider uses the BioPortal REST API for efficient data collection.
 """
 
-import scrapy
-import json
-from typing import Iterator, Dict, Any
-from scrapy.http import Response, Request
+import io
+import ijson
+import orjson
+from dataclasses import dataclass, field
+from typing import Iterator, Any, Optional
+from scrapy.http import JsonRequest, Response, Request
 import sys
 from pathlib import Path
 
@@ -19,6 +21,83 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from common.base_spider import BaseSpider
 
 
+# Ontology detail fields copied as-is from the API response
+_DETAIL_PASSTHROUGH = (
+    # Basic and administrative info
+    'acronym', 'name', 'accrualMethod', 'accrualPeriodicity',
+    # Ontology details
+    'ontologyType', 'hasOntologyLanguage', 'isOfType',
+    # Status and dates
+    'status', 'creationDate', 'dateReleased',
+    # Links
+    'homepage', 'documentation', 'publication', 'repository',
+    # Access info and notes
+    'viewingRestriction', 'licenseInformation', 'notes',
+)
+
+# List-valued fields that default to an empty list when missing
+_DETAIL_LIST_DEFAULTS = ('administeredBy', 'hasDomain', 'group', 'categories')
+
+
+@dataclass(slots=True)
+class OntologyItem:
+    """
+    Ontology detail item.
+    
+    A slotted dataclass rather than a dict: fixed attribute layout and less
+    memory per item. Scrapy exporters and pipelines read it through
+    ItemAdapter.
+    """
+    # Common metadata (BaseSpider.extract_common_metadata)
+    platform: Optional[str] = None
+    source_url: Optional[str] = None
+    scraped_at: Optional[str] = None
+    response_status: Optional[int] = None
+    track_id: Optional[str] = None
+    
+    # Basic information
+    ontology_id: Optional[str] = None
+    acronym: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    
+    # Administrative info
+    administeredBy: list = field(default_factory=list)
+    accrualMethod: Any = None
+    accrualPeriodicity: Any = None
+    
+    # Categorization
+    hasDomain: list = field(default_factory=list)
+    group: list = field(default_factory=list)
+    categories: list = field(default_factory=list)
+    
+    # Ontology details
+    ontologyType: Any = None
+    hasOntologyLanguage: Any = None
+    isOfType: Any = None
+    
+    # Status and dates
+    status: Any = None
+    creationDate: Optional[str] = None
+    dateReleased: Optional[str] = None
+    
+    # Derived fields
+    metrics: dict = field(default_factory=dict)
+    latest_submission: dict = field(default_factory=dict)
+    contacts: list = field(default_factory=list)
+    
+    # Links
+    homepage: Optional[str] = None
+    documentation: Optional[str] = None
+    publication: Any = None
+    repository: Optional[str] = None
+    
+    # Access info and notes
+    viewingRestriction: Any = None
+    licenseInformation: Any = None
+    notes: Any = None
+
+
 class BioportalSpider(BaseSpider):
     """
     Spider for BioPortal platform.
@@ -40,7 +119,28 @@ class BioportalSpider(BaseSpider):
     
     custom_settings = {
         **BaseSpider.custom_settings,
-        'DOWNLOAD_DELAY': 1,  # API can handle faster requests
+        # Multiplex all API calls over one HTTP/2 TLS connection
+        'DOWNLOAD_HANDLERS': {
+            'https': 'scrapy.core.downloader.handlers.http2.H2DownloadHandler',
+        },
+        # Detail fetches run in parallel through the scheduler; the global
+        # limit must not be lower than the per-domain one
+        'CONCURRENT_REQUESTS': 32,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 16,  # Streams share one connection
+        # No fixed delay; AutoThrottle backs off on API latency instead
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 1,
+        'AUTOTHROTTLE_MAX_DELAY': 30,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 8.0,
+        # gzip/deflate/br responses (br when brotli is installed); the
+        # middleware advertises them in Accept-Encoding and decodes bodies
+        'COMPRESSION_ENABLED': True,
+        # Revalidate cached ontologies with ETag/Last-Modified (304 Not Modified)
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.RFC2616Policy',
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_EXPIRATION_SECS': 604800,  # 7 days
     }
     
     def __init__(self, api_key=None, *args, **kwargs):
@@ -60,6 +160,13 @@ class BioportalSpider(BaseSpider):
                               "https://bioportal.bioontology.org/account")
         
         super().__init__(platform_config=platform_config, *args, **kwargs)
+        
+        # Request headers are built once and shared by every request
+        self._auth_headers = {
+            'Authorization': f'apikey token={self.api_key}',
+            'Accept': 'application/json',
+        }
+        self._auth_headers_min = {'Authorization': self._auth_headers['Authorization']}
     
     def start_requests(self):
         """
@@ -70,14 +177,9 @@ class BioportalSpider(BaseSpider):
                             "or in credentials.yaml")
             return
         
-        headers = {
-            'Authorization': f'apikey token={self.api_key}',
-            'Accept': 'application/json',
-        }
-        
-        yield scrapy.Request(
+        yield JsonRequest(
             url=self.API_ONTOLOGIES,
-            headers=headers,
+            headers=self._auth_headers,
             callback=self.parse_list_page,
             errback=self.handle_error,
             meta={'platform': self.platform_name}
@@ -93,22 +195,22 @@ class BioportalSpider(BaseSpider):
         Yields:
             Requests to ontology detail endpoints
         """
+        # Counted locally and added to stats once, even if parsing fails midway
+        scheduled = 0
         try:
-            data = json.loads(response.text)
-            
-            # API returns list of ontologies
-            ontologies = data if isinstance(data, list) else []
-            
-            self.logger.info(f"Found {len(ontologies)} ontologies")
-            
-            for ontology in ontologies:
+            # API returns list of ontologies; stream them so requests are
+            # scheduled as each ontology is decoded
+            count = 0
+            for ontology in ijson.items(io.BytesIO(response.body), 'item', use_float=True):
+                count += 1
+                
                 # Get the links object
                 links = ontology.get('@id') or ontology.get('links', {}).get('self')
                 
                 if links:
-                    yield scrapy.Request(
+                    yield JsonRequest(
                         url=links,
-                        headers={'Authorization': f'apikey token={self.api_key}'},
+                        headers=self._auth_headers_min,
                         callback=self.parse_detail_page,
                         errback=self.handle_error,
                         meta={
@@ -117,14 +219,18 @@ class BioportalSpider(BaseSpider):
                         }
                     )
                     
-                    self.stats['pages_scraped'] += 1
+                    scheduled += 1
+            
+            self.logger.info(f"Found {count} ontologies")
                     
-        except json.JSONDecodeError as e:
+        except ijson.JSONError as e:
             self.logger.error(f"Failed to parse JSON response: {e}")
         except Exception as e:
             self.logger.error(f"Error parsing ontologies list: {e}")
+        finally:
+            self.stats['pages_scraped'] += scheduled
     
-    def parse_detail_page(self, response: Response) -> Dict[str, Any]:
+    def parse_detail_page(self, response: Response) -> Optional[OntologyItem]:
         """
         Parse ontology detail page from API response.
         
@@ -132,75 +238,39 @@ class BioportalSpider(BaseSpider):
             response: JSON response from API
             
         Returns:
-            Dictionary with extracted data
+            OntologyItem with extracted data, or None (no item) if parsing failed
         """
         try:
-            data = json.loads(response.text)
-            
-            # Extract common metadata
-            item = self.extract_common_metadata(response)
+            data = orjson.loads(response.body)
             
-            # Extract ontology-specific fields
-            item.update({
-                # Basic information
-                'ontology_id': data.get('@id'),
-                'acronym': data.get('acronym'),
-                'name': data.get('name'),
-                'description': self.clean_text(data.get('description')),
-                
-                # Administrative info
-                'administeredBy': data.get('administeredBy', []),
-                'accrualMethod': data.get('accrualMethod'),
-                'accrualPeriodicity': data.get('accrualPeriodicity'),
-                
-                # Categorization
-                'hasDomain': data.get('hasDomain', []),
-                'group': data.get('group', []),
-                'categories': data.get('categories', []),
+            item = OntologyItem(
+                # Common metadata
+                **self.extract_common_metadata(response),
                 
-                # Ontology details
-                'ontologyType': data.get('ontologyType'),
-                'hasOntologyLanguage': data.get('hasOntologyLanguage'),
-                'isOfType': data.get('isOfType'),
+                # Ontology-specific fields
+                ontology_id=data.get('@id'),
+                description=self.clean_text(data.get('description')),
+                # orjson's decoded objects are shared by reference, not copied;
+                # an empty list is only allocated when the key is missing
+                **{key: data.get(key) for key in _DETAIL_PASSTHROUGH},
+                **{key: data[key] if key in data else [] for key in _DETAIL_LIST_DEFAULTS},
                 
-                # Status and dates
-                'status': data.get('status'),
-                'creationDate': data.get('creationDate'),
-                'dateReleased': data.get('dateReleased'),
-                
-                # Metrics (from latest submission)
-                'metrics': self._extract_metrics(data),
-                
-                # Latest submission info
-                'latest_submission': self._extract_submission_info(data),
-                
-                # Contact information
-                'contacts': self._extract_contacts(data),
-                
-                # Links
-                'homepage': data.get('homepage'),
-                'documentation': data.get('documentation'),
-                'publication': data.get('publication'),
-                'repository': data.get('repository'),
-                
-                # Access info
-                'viewingRestriction': data.get('viewingRestriction'),
-                'licenseInformation': data.get('licenseInformation'),
-                
-                # Notes
-                'notes': data.get('notes'),
-            })
+                # Derived fields
+                metrics=self._extract_metrics(data),
+                latest_submission=self._extract_submission_info(data),
+                contacts=self._extract_contacts(data),
+            )
             
             self.stats['items_extracted'] += 1
             
             return item
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             self.logger.error(f"Failed to parse JSON response: {e}")
-            return {}
+            return None
         except Exception as e:
             self.logger.error(f"Error parsing ontology detail: {e}")
-            return {}
+            return None
     
     def _extract_metrics(self, data: dict) -> dict:
         """Extract metrics information."""
@@ -230,17 +300,14 @@ class BioportalSpider(BaseSpider):
     
     def _extract_contacts(self, data: dict) -> list:
         """Extract contact information."""
-        contacts = []
-        
-        for contact in data.get('contacts', []):
-            contact_info = {
+        return [
+            {
                 'name': contact.get('name'),
                 'email': contact.get('email'),
                 'role': contact.get('role'),
             }
-            contacts.append(contact_info)
-        
-        return contacts
+            for contact in data.get('contacts', ())
+        ]
 
 
 if __name__ == "__main__":
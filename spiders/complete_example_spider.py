@@ -17,13 +17,131 @@ from typing import Iterator, Dict, Any
 from scrapy.http import Response, Request
 import sys
 from pathlib import Path
+from w3lib.url import add_or_replace_parameter
+from parsel.csstranslator import HTMLTranslator
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from common.base_spider import BaseSpider
+from common.base_spider import BaseSpider, css_xpath, css_text, first_match, own_text
 from common.extractors.comment_extractor import CommentExtractor
 
 
+_css_to_xpath = HTMLTranslator().css_to_xpath
+
+# Precompiled selectors, evaluated directly on lxml elements
+_DATASET_LINKS = css_xpath('div.dataset-item a.dataset-link::attr(href)')
+_NEXT_PAGE = css_xpath('a.next-page::attr(href)')
+_CONTENT_IMAGES = css_xpath('div.content img::attr(src)')
+_NEXT_COMMENTS_PAGE = css_xpath('a.next-comments-page::attr(href)')
+_COMMENT_PAGE_TOTAL = css_xpath('nav.comments::attr(data-total)')
+_PUB_AUTHORS = css_xpath('span.pub-author::text')
+
+
+# Whole description text, with its text blocks kept apart
+_DESCRIPTION_TEXT = css_text('div.description')
+
+
+def _compile_rows(items_css: str, columns: Dict[str, str]) -> tuple:
+    """
+    Compile a list section for column-wise extraction.
+    
+    Each column gets a document-level XPath (all values in one lxml call)
+    and a per-item XPath used when the columns do not line up.
+    """
+    return (
+        _css_to_xpath(items_css),
+        {
+            name: (_css_to_xpath(f'{items_css} {css}'), _css_to_xpath(css))
+            for name, css in columns.items()
+        },
+    )
+
+
+# List sections: (item selector, {field: selector relative to the item})
+_SUPPLEMENTARY_ROWS = _compile_rows('div.supplementary-files li.file-item', {
+    'url': 'a::attr(href)',
+    'filename': 'span.filename::text',
+    'size': 'span.filesize::text',
+    'description': 'span.description::text',
+})
+_PEER_REVIEW_ROWS = _compile_rows('div.peer-reviews li.review-file', {
+    'url': 'a::attr(href)',
+    'filename': 'span.filename::text',
+    'reviewer': 'span.reviewer::text',
+    'date': 'span.date::text',
+})
+_PUBLICATION_ROWS = _compile_rows('div.related-publications li.publication', {
+    'title': 'h4.pub-title::text',
+    'journal': 'span.pub-journal::text',
+    'year': 'span.pub-year::text',
+    'doi': 'a.pub-doi::attr(href)',
+})
+
+# Page-level fields collected in a single tree walk: (tag, class) -> (field, source).
+# source 'text' takes the element's own text nodes (like '::text'),
+# anything else is an attribute name.
+_PAGE_FIELDS = {
+    ('h1', 'dataset-title'): ('title', 'text'),
+    ('span', 'author'): ('authors', 'text'),
+    ('span', 'pub-date'): ('publication_date', 'text'),
+    ('span', 'doi'): ('doi', 'text'),
+    ('span', 'keyword'): ('keywords', 'text'),
+    ('a', 'download-pdf'): ('pdf_url', 'href'),
+    ('span', 'dataset-id'): ('dataset_id', 'text'),
+    ('span', 'version'): ('version', 'text'),
+    ('span', 'license'): ('license', 'text'),
+    ('span', 'access-type'): ('access_type', 'text'),
+    ('span', 'downloads'): ('download_count', 'text'),
+    ('span', 'views'): ('view_count', 'text'),
+    ('span', 'citations'): ('citation_count', 'text'),
+    ('a', 'view-all-comments'): ('comments_page_url', 'href'),
+    ('span', 'funding-agency'): ('funding_agency', 'text'),
+    ('span', 'grant-number'): ('grant_number', 'text'),
+    ('span', 'funding-amount'): ('funding_amount', 'text'),
+    ('span', 'contact-name'): ('contact_name', 'text'),
+    ('a', 'contact-email'): ('contact_email', 'href'),
+    ('span', 'contact-institution'): ('contact_institution', 'text'),
+}
+
+# Fields that keep every match (like getall()); the rest keep the first (like get())
+_PAGE_LIST_FIELDS = frozenset(('authors', 'keywords'))
+
+_PAGE_TAGS = tuple({tag for tag, _ in _PAGE_FIELDS})
+
+
+def _walk_page_fields(root) -> Dict[str, Any]:
+    """
+    Collect all _PAGE_FIELDS in one pass over the lxml tree.
+    
+    Replaces one XPath evaluation over the whole document per field.
+    """
+    fields = {name: [] for name in _PAGE_LIST_FIELDS}
+    
+    for el in root.iter(*_PAGE_TAGS):
+        classes = el.get('class')
+        if not classes:
+            continue
+        
+        for css_class in classes.split():
+            spec = _PAGE_FIELDS.get((el.tag, css_class))
+            if spec is None:
+                continue
+            
+            name, source = spec
+            if source == 'text':
+                values = own_text(el)
+            else:
+                value = el.get(source)
+                values = [value] if value is not None else []
+            
+            if name in _PAGE_LIST_FIELDS:
+                fields[name].extend(values)
+            elif values and name not in fields:
+                fields[name] = values[0]
+    
+    return fields
+
+
 class CompleteExampleSpider(BaseSpider):
     """
     Complete example spider showing all extraction capabilities.
@@ -67,6 +185,14 @@ class CompleteExampleSpider(BaseSpider):
         }
         
         super().__init__(platform_config=platform_config, *args, **kwargs)
+        
+        # Items waiting for their comment pages, keyed by detail page URL.
+        # Only the key travels in Request.meta, not the growing item.
+        self._pending_items: Dict[str, Dict[str, Any]] = {}
+        
+        # Comment pages fetched concurrently, per item key:
+        # {'remaining': pages still outstanding, 'pages': {page number: comments}}
+        self._comment_fanout: Dict[str, Dict[str, Any]] = {}
     
     def parse_list_page(self, response: Response) -> Iterator[Request]:
         """
@@ -77,10 +203,12 @@ class CompleteExampleSpider(BaseSpider):
         self.logger.info(f"Parsing list page: {response.url}")
         
         # Example selector - adjust for your platform
-        dataset_links = response.css('div.dataset-item a.dataset-link::attr(href)').getall()
+        root = response.selector.root
+        dataset_links = _DATASET_LINKS(root)
         
+        join = self.url_joiner(response, root)
         for link in dataset_links:
-            dataset_url = response.urljoin(link)
+            dataset_url = join(link)
             
             yield scrapy.Request(
                 url=dataset_url,
@@ -88,11 +216,11 @@ class CompleteExampleSpider(BaseSpider):
                 errback=self.handle_error,
                 meta={'platform': self.platform_name}
             )
-            
-            self.stats['pages_scraped'] += 1
+        
+        self.stats['pages_scraped'] += len(dataset_links)
         
         # Handle pagination
-        next_page = response.css('a.next-page::attr(href)').get()
+        next_page = first_match(root, _NEXT_PAGE)
         if next_page:
             yield scrapy.Request(
                 url=response.urljoin(next_page),
@@ -111,48 +239,48 @@ class CompleteExampleSpider(BaseSpider):
         # 1. Extract common metadata
         item = self.extract_common_metadata(response)
         
+        # Walk the page once for all single-element fields
+        root = response.selector.root
+        fields = _walk_page_fields(root)
+        
         # 2. Extract basic information
         item.update({
-            'title': self.clean_text(response.css('h1.dataset-title::text').get()),
-            'description': self.clean_text(
-                ' '.join(response.css('div.description *::text').getall())
-            ),
-            'authors': response.css('span.author::text').getall(),
-            'publication_date': self.clean_text(response.css('span.pub-date::text').get()),
-            'doi': self.clean_text(response.css('span.doi::text').get()),
-            'keywords': response.css('span.keyword::text').getall(),
+            'title': self.clean_text(fields.get('title')),
+            'description': self.clean_text(_DESCRIPTION_TEXT(root)),
+            'authors': fields['authors'],
+            'publication_date': self.clean_text(fields.get('publication_date')),
+            'doi': self.clean_text(fields.get('doi')),
+            'keywords': fields['keywords'],
         })
         
         # 3. Extract PDF URL (main file)
-        pdf_url = response.css('a.download-pdf::attr(href)').get()
+        pdf_url = fields.get('pdf_url')
         if pdf_url:
             item['pdf_url'] = response.urljoin(pdf_url)
         
+        join = self.url_joiner(response, root)
+        
         # 4. Extract supplementary files
-        supplementary_files = []
-        for file_elem in response.css('div.supplementary-files li.file-item'):
-            file_info = {
-                'url': response.urljoin(file_elem.css('a::attr(href)').get()),
-                'filename': self.clean_text(file_elem.css('span.filename::text').get()),
-                'size': self.clean_text(file_elem.css('span.filesize::text').get()),
-                'description': self.clean_text(file_elem.css('span.description::text').get()),
+        item['supplementary_files'] = [
+            {
+                'url': join(row['url']),
+                'filename': self.clean_text(row['filename']),
+                'size': self.clean_text(row['size']),
+                'description': self.clean_text(row['description']),
             }
-            supplementary_files.append(file_info)
-        
-        item['supplementary_files'] = supplementary_files
+            for row in self._extract_rows(response, _SUPPLEMENTARY_ROWS)[1]
+        ]
         
         # 5. Extract peer review files (if available)
-        peer_review_files = []
-        for review_elem in response.css('div.peer-reviews li.review-file'):
-            review_info = {
-                'url': response.urljoin(review_elem.css('a::attr(href)').get()),
-                'filename': self.clean_text(review_elem.css('span.filename::text').get()),
-                'reviewer': self.clean_text(review_elem.css('span.reviewer::text').get()),
-                'date': self.clean_text(review_elem.css('span.date::text').get()),
+        item['peer_review_files'] = [
+            {
+                'url': join(row['url']),
+                'filename': self.clean_text(row['filename']),
+                'reviewer': self.clean_text(row['reviewer']),
+                'date': self.clean_text(row['date']),
             }
-            peer_review_files.append(review_info)
-        
-        item['peer_review_files'] = peer_review_files
+            for row in self._extract_rows(response, _PEER_REVIEW_ROWS)[1]
+        ]
         
         # 6. Extract comments using CommentExtractor
         comment_extractor = CommentExtractor(response)
@@ -168,42 +296,44 @@ class CompleteExampleSpider(BaseSpider):
         item['comments'] = comments
         
         # 7. Extract images from the page
-        image_urls = []
-        for img in response.css('div.content img::attr(src)').getall():
-            image_url = response.urljoin(img)
-            image_urls.append(image_url)
-        
-        item['image_urls'] = image_urls
+        item['image_urls'] = [
+            join(img)
+            for img in _CONTENT_IMAGES(root)
+        ]
         
         # 8. Extract additional metadata
         item.update({
-            'dataset_id': self.clean_text(response.css('span.dataset-id::text').get()),
-            'version': self.clean_text(response.css('span.version::text').get()),
-            'license': self.clean_text(response.css('span.license::text').get()),
-            'access_type': self.clean_text(response.css('span.access-type::text').get()),
+            'dataset_id': self.clean_text(fields.get('dataset_id')),
+            'version': self.clean_text(fields.get('version')),
+            'license': self.clean_text(fields.get('license')),
+            'access_type': self.clean_text(fields.get('access_type')),
             
             # Statistics
-            'download_count': self.clean_text(response.css('span.downloads::text').get()),
-            'view_count': self.clean_text(response.css('span.views::text').get()),
-            'citation_count': self.clean_text(response.css('span.citations::text').get()),
+            'download_count': self.clean_text(fields.get('download_count')),
+            'view_count': self.clean_text(fields.get('view_count')),
+            'citation_count': self.clean_text(fields.get('citation_count')),
             
             # Related information
             'related_publications': self._extract_publications(response),
-            'funding_information': self._extract_funding(response),
-            'contact_information': self._extract_contact(response),
+            'funding_information': self._extract_funding(fields),
+            'contact_information': self._extract_contact(fields),
         })
         
         # 9. Check if there are additional pages (e.g., separate comments page)
-        comments_page_url = response.css('a.view-all-comments::attr(href)').get()
+        comments_page_url = fields.get('comments_page_url')
         if comments_page_url:
+            # Park the item until its comment pages are parsed
+            item_key = response.url
+            self._pending_items[item_key] = item
+            
             # Request the comments page
             yield scrapy.Request(
                 url=response.urljoin(comments_page_url),
                 callback=self.parse_comments_page,
-                errback=self.handle_error,
+                errback=self.handle_comments_error,
                 meta={
                     'platform': self.platform_name,
-                    'parent_item': item,  # Pass the main item
+                    'item_key': item_key,
                 }
             )
         else:
@@ -219,8 +349,9 @@ class CompleteExampleSpider(BaseSpider):
         """
         self.logger.info(f"Parsing comments page: {response.url}")
         
-        # Get the parent item from meta
-        item = response.meta.get('parent_item', {})
+        # Get the parent item parked by parse_detail_page
+        item_key = response.meta['item_key']
+        item = self._pending_items[item_key]
         
         # Extract comments from this page
         comment_extractor = CommentExtractor(response)
@@ -233,60 +364,146 @@ class CompleteExampleSpider(BaseSpider):
             attachment_selector='div.comment-attachments a.attachment-link'
         )
         
+        page = response.meta.get('comments_page')
+        if page is not None:
+            # One of the concurrently fetched pages
+            yield from self._collect_comment_page(item_key, page, additional_comments)
+            return
+        
         # Merge with existing comments
-        existing_comments = item.get('comments', [])
-        item['comments'] = existing_comments + additional_comments
+        item['comments'].extend(additional_comments)
+        
+        # Total page count known up front: request all remaining pages at
+        # once so the downloader fetches them concurrently
+        root = response.selector.root
+        total_pages = int(first_match(root, _COMMENT_PAGE_TOTAL) or 1)
+        if total_pages > 1:
+            self._comment_fanout[item_key] = {'remaining': total_pages - 1, 'pages': {}}
+            for page in range(2, total_pages + 1):
+                yield scrapy.Request(
+                    url=add_or_replace_parameter(response.url, 'page', str(page)),
+                    callback=self.parse_comments_page,
+                    errback=self.handle_comments_error,
+                    meta={
+                        'platform': self.platform_name,
+                        'item_key': item_key,
+                        'comments_page': page,
+                    }
+                )
+            return
         
         # Handle pagination in comments
-        next_comments_page = response.css('a.next-comments-page::attr(href)').get()
+        next_comments_page = first_match(root, _NEXT_COMMENTS_PAGE)
         if next_comments_page:
             yield scrapy.Request(
                 url=response.urljoin(next_comments_page),
                 callback=self.parse_comments_page,
-                errback=self.handle_error,
+                errback=self.handle_comments_error,
                 meta={
                     'platform': self.platform_name,
-                    'parent_item': item,
+                    'item_key': item_key,
                 }
             )
         else:
             # No more pages, yield the complete item
+            self.stats['items_extracted'] += 1
+            yield self._pending_items.pop(item_key)
+    
+    def handle_comments_error(self, failure):
+        """
+        Handle a failed comments page: log it and emit the item with the
+        comments collected so far instead of keeping it parked forever.
+        """
+        self.handle_error(failure)
+        
+        meta = failure.request.meta
+        if meta.get('comments_page') is not None:
+            # A concurrently fetched page failed: count it as empty
+            yield from self._collect_comment_page(meta['item_key'], meta['comments_page'], [])
+            return
+        
+        item = self._pending_items.pop(meta['item_key'], None)
+        if item is not None:
             self.stats['items_extracted'] += 1
             yield item
     
+    def _collect_comment_page(self, item_key: str, page: int, comments: list):
+        """
+        Store one concurrently fetched comment page; once all have arrived,
+        merge them in page order and yield the complete item.
+        """
+        fanout = self._comment_fanout.get(item_key)
+        if fanout is None:
+            return
+        
+        fanout['pages'][page] = comments
+        fanout['remaining'] -= 1
+        if fanout['remaining']:
+            return
+        
+        del self._comment_fanout[item_key]
+        item = self._pending_items.pop(item_key)
+        for number in sorted(fanout['pages']):
+            item['comments'].extend(fanout['pages'][number])
+        
+        self.stats['items_extracted'] += 1
+        yield item
+    
+    def _extract_rows(self, response: Response, rows: tuple) -> tuple:
+        """
+        Extract a list section column by column.
+        
+        Each column is fetched with one document-level XPath and the columns
+        are zipped into rows. If any column does not have exactly one value per
+        item (a missing or repeated field), zipping would misalign rows, so
+        the values are read per item instead.
+        
+        Returns:
+            (item selectors, list of raw field dictionaries)
+        """
+        items_xpath, columns = rows
+        items = response.xpath(items_xpath)
+        
+        values = {name: response.xpath(column).getall() for name, (column, _) in columns.items()}
+        if all(len(column) == len(items) for column in values.values()):
+            return items, [dict(zip(values, row)) for row in zip(*values.values())]
+        
+        return items, [
+            {name: item.xpath(relative).get() for name, (_, relative) in columns.items()}
+            for item in items
+        ]
+    
     def _extract_publications(self, response: Response) -> list:
         """Extract related publications."""
-        publications = []
-        
-        for pub_elem in response.css('div.related-publications li.publication'):
-            publication = {
-                'title': self.clean_text(pub_elem.css('h4.pub-title::text').get()),
-                'authors': pub_elem.css('span.pub-author::text').getall(),
-                'journal': self.clean_text(pub_elem.css('span.pub-journal::text').get()),
-                'year': self.clean_text(pub_elem.css('span.pub-year::text').get()),
-                'doi': self.clean_text(pub_elem.css('a.pub-doi::attr(href)').get()),
+        items, rows = self._extract_rows(response, _PUBLICATION_ROWS)
+        
+        return [
+            {
+                'title': self.clean_text(row['title']),
+                'authors': _PUB_AUTHORS(pub_elem.root),
+                'journal': self.clean_text(row['journal']),
+                'year': self.clean_text(row['year']),
+                'doi': self.clean_text(row['doi']),
             }
-            publications.append(publication)
-        
-        return publications
+            for pub_elem, row in zip(items, rows)
+        ]
     
-    def _extract_funding(self, response: Response) -> dict:
-        """Extract funding information."""
+    def _extract_funding(self, fields: Dict[str, Any]) -> dict:
+        """Extract funding information from the walked page fields."""
         return {
-            'agency': self.clean_text(response.css('span.funding-agency::text').get()),
-            'grant_number': self.clean_text(response.css('span.grant-number::text').get()),
-            'amount': self.clean_text(response.css('span.funding-amount::text').get()),
+            'agency': self.clean_text(fields.get('funding_agency')),
+            'grant_number': self.clean_text(fields.get('grant_number')),
+            'amount': self.clean_text(fields.get('funding_amount')),
         }
     
-    def _extract_contact(self, response: Response) -> dict:
-        """Extract contact information."""
+    def _extract_contact(self, fields: Dict[str, Any]) -> dict:
+        """Extract contact information from the walked page fields."""
         return {
-            'name': self.clean_text(response.css('span.contact-name::text').get()),
-            'email': self.clean_text(response.css('a.contact-email::attr(href)').get()),
-            'institution': self.clean_text(response.css('span.contact-institution::text').get()),
+            'name': self.clean_text(fields.get('contact_name')),
+            'email': self.clean_text(fields.get('contact_email')),
+            'institution': self.clean_text(fields.get('contact_institution')),
         }
 
-
 if __name__ == "__main__":
     # For testing purposes
     from scrapy.crawler import CrawlerProcess
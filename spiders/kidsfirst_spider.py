@@ -14,10 +14,78 @@ import sys
 from pathlib import Path
 import json
 import re
+from lxml.etree import XPath
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from common.base_spider import BaseSpider
+from common.base_spider import BaseSpider, compile_xpath, css_xpath, css_text, block_text, first_match, field_collector
+
+
+# Precompiled selectors, evaluated directly on lxml elements
+_STUDY_LINKS = css_xpath('a[href*="/study/"]::attr(href)')
+_STUDY_LINKS_FALLBACK = css_xpath('a.study-link::attr(href)')
+_PORTAL_LINKS = css_xpath('a[href*="portal.kidsfirstdrc.org"]::attr(href)')
+
+# Resources overview lists under a div labelled $title. Only divs whose own text
+# holds the label match; cssselect's :contains() tested string(.), which also
+# matched every enclosing div and walked their siblings too.
+_LABEL_DIVS = '//div[contains(text(), $title)]'
+_LABELLED_LIST_ITEMS = compile_xpath(
+    f'{_LABEL_DIVS}/following-sibling::*[1][self::div]//li'
+    f'|{_LABEL_DIVS}/following-sibling::ul//li'
+)
+_LABELLED_HEADINGS_AND_ITEMS = compile_xpath(
+    f'{_LABEL_DIVS}/following-sibling::div//h4'
+    f'|{_LABEL_DIVS}/following-sibling::ul//li'
+)
+
+# Key feature sections: list items following the headings that contain $title
+_SECTION_HEADINGS = (
+    '(//h2[contains(text(), $title)]'
+    '|//h3[contains(text(), $title)]'
+    '|//div[contains(text(), $title)])'
+)
+_SECTION_ITEMS = compile_xpath(
+    f'{_SECTION_HEADINGS}/following-sibling::ul[1]//li/text()|'
+    f'{_SECTION_HEADINGS}/following-sibling::div[1]//li/text()'
+)
+
+# FAQ entries
+_FAQ_ITEMS = css_xpath('div[role="button"]:contains("?"), button:contains("?")')
+_FAQ_QUESTION = css_xpath('::text')
+_FAQ_ANSWER = compile_xpath('following-sibling::div[1]')
+
+# Study detail fields
+_TITLE = css_xpath('h1::text')
+_DESCRIPTION_TEXT = css_text('div.description')
+_DATA_TYPES = css_xpath('div.data-types span::text')
+_SAMPLE_COUNT = css_xpath('span.sample-count::text, div:contains("Samples")::text')
+_PARTICIPANT_COUNT = css_xpath('span.participant-count::text, div:contains("Participants")::text')
+_CONDITIONS = css_xpath('div.conditions span::text')
+_STUDY_ID_IN_URL = re.compile(r'/study/([^/]+)')
+
+# dbGaP accession, matched on the raw body bytes (no decode to str)
+_PHS_ACCESSION = re.compile(rb'phs\d+', re.IGNORECASE)
+
+# Single-value study fields collected in one tree walk: (tag, class) -> (field, source)
+_DETAIL_FIELDS = {
+    ('span', 'study-id'): ('study_id', 'text'),
+    ('div', 'study-id'): ('study_id', 'text'),
+    ('div', 'pi-name'): ('principal_investigator', 'text'),
+    ('span', 'pi'): ('principal_investigator', 'text'),
+    ('span', 'disease-category'): ('disease_category', 'text'),
+    ('span', 'access-type'): ('access_type', 'text'),
+}
+_collect_detail_fields = field_collector(_DETAIL_FIELDS)
+
+# Publications
+_PUB_ITEMS = css_xpath('div.publication-item, li.publication')
+_PUB_TITLE = css_xpath('h4::text, .pub-title::text')
+_PUB_CITATION = css_xpath('.citation::text')
+_PUB_LINK_XPS = {
+    'doi': css_xpath('a[href*="doi.org"]::attr(href)'),
+    'pmid': css_xpath('a[href*="pubmed"]::attr(href)'),
+}
 
 
 class KidsfirstSpider(BaseSpider):
@@ -40,7 +108,19 @@ class KidsfirstSpider(BaseSpider):
     
     custom_settings = {
         **BaseSpider.custom_settings,
-        'DOWNLOAD_DELAY': 2,
+        # Multiplex detail page fetches over one HTTP/2 TLS connection
+        'DOWNLOAD_HANDLERS': {
+            'https': 'scrapy.core.downloader.handlers.http2.H2DownloadHandler',
+        },
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,  # Streams share one connection
+        # AutoThrottle paces requests from server latency instead of a fixed delay
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 2,
+        'AUTOTHROTTLE_MAX_DELAY': 30,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        # Skip detail pages already scraped by a previous run
+        'DUPEFILTER_CLASS': 'common.dupefilter.BloomDupeFilter',
     }
     
     def __init__(self, *args, **kwargs):
@@ -53,6 +133,10 @@ class KidsfirstSpider(BaseSpider):
         }
         
         super().__init__(platform_config=platform_config, *args, **kwargs)
+        
+        # Detail URLs already scheduled in this run; pages repeat the same
+        # links, and skipping them here avoids building duplicate Requests
+        self._scheduled_urls = set()
     
     def parse_list_page(self, response: Response) -> Iterator[Request]:
         """
@@ -73,20 +157,26 @@ class KidsfirstSpider(BaseSpider):
         """
         self.logger.info(f"Parsing resources page: {response.url}")
         
+        root = self.parse_html(response)
+        join = self.url_joiner(response, root)
+        
         # Look for study links
-        study_links = response.css('a[href*="/study/"]::attr(href)').getall()
+        study_links = _STUDY_LINKS(root)
         
         if not study_links:
             # Try alternative selectors
-            study_links = response.css('a.study-link::attr(href)').getall()
+            study_links = _STUDY_LINKS_FALLBACK(root)
         
         # Also look for data portal links
-        portal_links = response.css('a[href*="portal.kidsfirstdrc.org"]::attr(href)').getall()
+        portal_links = _PORTAL_LINKS(root)
         
         self.logger.info(f"Found {len(study_links)} study links and {len(portal_links)} portal links")
         
         for link in study_links:
-            study_url = response.urljoin(link)
+            study_url = join(link)
+            if study_url in self._scheduled_urls:
+                continue
+            self._scheduled_urls.add(study_url)
             
             yield scrapy.Request(
                 url=study_url,
@@ -98,19 +188,22 @@ class KidsfirstSpider(BaseSpider):
             self.stats['pages_scraped'] += 1
         
         # Extract information from the current page
-        yield self.parse_resources_page(response)
+        yield self.parse_resources_page(response, root)
     
-    def parse_resources_page(self, response: Response) -> Dict[str, Any]:
+    def parse_resources_page(self, response: Response, root=None) -> Dict[str, Any]:
         """
         Parse the main resources page for general information.
         
         Args:
             response: Response from resources page
+            root: Parsed tree of the response, if already built by the caller
             
         Returns:
             Dictionary with extracted data
         """
-        item = self.extract_common_metadata(response)
+        if root is None:
+            root = self.parse_html(response)
+        item = self.extract_common_metadata(response, root=root)
         
         item.update({
             'page_type': 'resources_overview',
@@ -118,32 +211,24 @@ class KidsfirstSpider(BaseSpider):
             
             # Extract data features
             'data_features': {
-                'genomic': self._extract_list_items(
-                    response, 
-                    'div:contains("Genomic") + div li, div:contains("Genomic") ~ ul li'
-                ),
-                'clinical': self._extract_list_items(
-                    response,
-                    'div:contains("Clinical") + div li, div:contains("Clinical") ~ ul li'
-                ),
+                'genomic': self._extract_list_items(root, _LABELLED_LIST_ITEMS, 'Genomic'),
+                'clinical': self._extract_list_items(root, _LABELLED_LIST_ITEMS, 'Clinical'),
             },
             
             # Extract data modalities
             'data_modalities': self._extract_list_items(
-                response,
-                'div:contains("Data Modalities") ~ div h4, '
-                'div:contains("Data Modalities") ~ ul li'
+                root, _LABELLED_HEADINGS_AND_ITEMS, 'Data Modalities'
             ),
             
             # Extract key features
             'key_features': {
-                'stronger': self._extract_section_text(response, 'Stronger'),
-                'faster': self._extract_section_text(response, 'Faster'),
-                'greater': self._extract_section_text(response, 'Greater'),
+                'stronger': self._extract_section_text(root, 'Stronger'),
+                'faster': self._extract_section_text(root, 'Faster'),
+                'greater': self._extract_section_text(root, 'Greater'),
             },
             
             # Extract FAQ information
-            'faqs': self._extract_faqs(response),
+            'faqs': self._extract_faqs(root),
             
             # Contact and access info
             'portal_url': 'https://portal.kidsfirstdrc.org',
@@ -173,113 +258,92 @@ class KidsfirstSpider(BaseSpider):
         """
         self.logger.info(f"Parsing detail page: {response.url}")
         
-        item = self.extract_common_metadata(response)
+        root = self.parse_html(response)
+        item = self.extract_common_metadata(response, root=root)
+        
+        # Single-value fields, cleaned together in one pass
+        fields = self.clean_texts({
+            **_collect_detail_fields(root),
+            'title': first_match(root, _TITLE),
+            'description': _DESCRIPTION_TEXT(root),
+            'sample_count': first_match(root, _SAMPLE_COUNT),
+            'participant_count': first_match(root, _PARTICIPANT_COUNT),
+        })
         
         item.update({
             'page_type': 'study_detail',
-            'title': self.clean_text(response.css('h1::text').get()),
-            'description': self.clean_text(
-                ' '.join(response.css('div.description *::text').getall())
-            ),
+            'title': fields['title'],
+            'description': fields['description'],
             
             # Study information
-            'study_id': self._extract_study_id(response),
-            'principal_investigator': self.clean_text(
-                response.css('div.pi-name::text, span.pi::text').get()
-            ),
+            'study_id': self._extract_study_id(response, fields['study_id']),
+            'principal_investigator': fields['principal_investigator'],
             
             # Data information
-            'data_types': response.css('div.data-types span::text').getall(),
-            'sample_count': self.clean_text(
-                response.css('span.sample-count::text, div:contains("Samples")::text').get()
-            ),
-            'participant_count': self.clean_text(
-                response.css('span.participant-count::text, div:contains("Participants")::text').get()
-            ),
+            'data_types': _DATA_TYPES(root),
+            'sample_count': fields['sample_count'],
+            'participant_count': fields['participant_count'],
             
             # Disease/condition
-            'conditions': response.css('div.conditions span::text').getall(),
-            'disease_category': self.clean_text(
-                response.css('span.disease-category::text').get()
-            ),
+            'conditions': _CONDITIONS(root),
+            'disease_category': fields['disease_category'],
             
             # Access information
             'dbgap_accession': self._extract_dbgap_accession(response),
-            'access_type': self.clean_text(
-                response.css('span.access-type::text').get()
-            ),
+            'access_type': fields['access_type'],
             
             # Publications
-            'publications': self._extract_publications(response),
+            'publications': self._extract_publications(root),
         })
         
         self.stats['items_extracted'] += 1
         
         return item
     
-    def _extract_list_items(self, response: Response, selector: str) -> list:
-        """Extract list items using CSS selector."""
+    def _extract_list_items(self, root, selector: XPath, title: str) -> list:
+        """Extract list items using a precompiled selector parameterized by $title."""
         items = []
-        for item in response.css(selector):
-            text = self.clean_text(' '.join(item.css('*::text').getall()))
+        for item in selector(root, title=title):
+            text = self.clean_text(block_text(item))
             if text:
                 items.append(text)
         return items
     
-    def _extract_section_text(self, response: Response, section_title: str) -> list:
+    def _extract_section_text(self, root, section_title: str) -> list:
         """Extract text from a section by title."""
-        items = []
-        
-        # Find section by title
-        section = response.xpath(
-            f'//h2[contains(text(), "{section_title}")]'
-            f'|//h3[contains(text(), "{section_title}")]'
-            f'|//div[contains(text(), "{section_title}")]'
-        )
-        
-        if section:
-            # Get following list items
-            items = section.xpath(
-                'following-sibling::ul[1]//li/text()|'
-                'following-sibling::div[1]//li/text()'
-            ).getall()
-            items = [self.clean_text(item) for item in items if item.strip()]
-        
-        return items
+        # Find section by title and get the following list items
+        return [
+            self.clean_text(item)
+            for item in _SECTION_ITEMS(root, title=section_title)
+            if item.strip()
+        ]
     
-    def _extract_faqs(self, response: Response) -> list:
+    def _extract_faqs(self, root) -> list:
         """Extract FAQ information."""
         faqs = []
         
         # Look for FAQ sections
-        faq_items = response.css('div[role="button"]:contains("?"), button:contains("?")')
-        
-        for faq in faq_items:
-            question = self.clean_text(faq.css('::text').get())
+        for faq in _FAQ_ITEMS(root):
+            question = self._txt(faq, _FAQ_QUESTION)
+            if not question:
+                continue
             
             # Try to get answer (might be in next sibling or hidden div)
-            answer = self.clean_text(
-                ' '.join(faq.xpath('following-sibling::div[1]//text()').getall())
-            )
+            answer_div = first_match(faq, _FAQ_ANSWER)
+            answer = self.clean_text(block_text(answer_div)) if answer_div is not None else ''
             
-            if question:
-                faqs.append({
-                    'question': question,
-                    'answer': answer if answer else 'See website for details',
-                })
+            faqs.append({
+                'question': question,
+                'answer': answer if answer else 'See website for details',
+            })
         
         return faqs
     
-    def _extract_study_id(self, response: Response) -> str:
-        """Extract study ID from page."""
-        # Try to find study ID in various formats
-        study_id = self.clean_text(
-            response.css('span.study-id::text, div.study-id::text').get()
-        )
-        
+    def _extract_study_id(self, response: Response, study_id: str) -> str:
+        """Extract study ID from page, falling back to the URL."""
         if not study_id:
             # Try to extract from URL
-            match = re.search(r'/study/([^/]+)', response.url)
+            match = _STUDY_ID_IN_URL.search(response.url)
             if match:
                 study_id = match.group(1)
         
@@ -288,28 +352,33 @@ class KidsfirstSpider(BaseSpider):
     def _extract_dbgap_accession(self, response: Response) -> str:
         """Extract dbGaP accession number."""
         # Look for PHS accession number
-        text = response.text
-        match = re.search(r'(phs\d+)', text, re.IGNORECASE)
+        match = _PHS_ACCESSION.search(response.body)
         
         if match:
-            return match.group(1)
+            return match.group(0).decode('ascii')
         
         return None
     
-    def _extract_publications(self, response: Response) -> list:
+    def _extract_publications(self, root) -> list:
         """Extract publication information."""
+        pubs = _PUB_ITEMS(root)
+        if not pubs:
+            return []
+        
         publications = []
         
-        for pub in response.css('div.publication-item, li.publication'):
-            publication = {
-                'title': self.clean_text(pub.css('h4::text, .pub-title::text').get()),
-                'citation': self.clean_text(pub.css('.citation::text').get()),
-                'doi': self.clean_text(pub.css('a[href*="doi.org"]::attr(href)').get()),
-                'pmid': self.clean_text(pub.css('a[href*="pubmed"]::attr(href)').get()),
-            }
+        for pub in pubs:
+            # Entries need a title or citation; check those before the links
+            title = self._txt(pub, _PUB_TITLE)
+            citation = self._txt(pub, _PUB_CITATION)
+            if not (title or citation):
+                continue
             
-            if publication['title'] or publication['citation']:
-                publications.append(publication)
+            publications.append({
+                'title': title,
+                'citation': citation,
+                **{field: self._txt(pub, xpath) for field, xpath in _PUB_LINK_XPS.items()},
+            })
         
         return publications
 
@@ -16,7 +16,67 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from common.base_spider import BaseSpider
+from common.base_spider import BaseSpider, css_xpath, css_text, field_collector
+
+
+# Precompiled selectors, evaluated directly on lxml elements
+_DATASET_LINKS = css_xpath('div.dataset-item a::attr(href), table.datasets tr td a::attr(href)')
+_DATASET_LINKS_FALLBACK = css_xpath('a[href*="/datasets/"]::attr(href)')
+_NEXT_PAGE = css_xpath('a.next-page::attr(href), a[rel="next"]::attr(href)')
+
+# Single-value dataset fields collected in one tree walk: (tag, class) -> (field, source)
+_DETAIL_FIELDS = {
+    ('h1', 'dataset-title'): ('dataset_name', 'text'),
+    ('span', 'dataset-id'): ('dataset_id', 'text'),
+    ('span', 'acronym'): ('acronym', 'text'),
+    ('span', 'study-type'): ('study_type', 'text'),
+    ('div', 'study-design'): ('study_design', 'text'),
+    ('span', 'participants'): ('participant_count', 'text'),
+    ('span', 'age-range'): ('age_range', 'text'),
+    ('span', 'gender'): ('gender_distribution', 'text'),
+    ('span', 'collection-start'): ('collection_start', 'text'),
+    ('span', 'collection-end'): ('collection_end', 'text'),
+    ('div', 'polysomnography'): ('polysomnography', 'text'),
+    ('span', 'access-type'): ('access_type', 'text'),
+    ('div', 'data-use-agreement'): ('data_use_agreement', 'text'),
+    ('span', 'pi-name'): ('principal_investigator', 'text'),
+    ('span', 'institution'): ('institution', 'text'),
+    ('span', 'funding'): ('funding_source', 'text'),
+    ('span', 'grant'): ('grant_number', 'text'),
+    ('a', 'contact-email'): ('contact_email', 'href'),
+}
+
+_collect_detail_fields = field_collector(_DETAIL_FIELDS)
+
+# Text blocks: whole text content of the section, read in one lxml call
+_DESCRIPTION_TEXT = css_text('div.description')
+_OBJECTIVES_TEXT = css_text('div.objectives')
+
+# List-valued dataset fields
+_COLLECTION_METHODS = css_xpath('div.methods li::text')
+_SLEEP_MEASURES = css_xpath('div.sleep-measures li::text')
+_DATA_FORMATS = css_xpath('div.data-formats span::text')
+
+# Data files
+_FILE_ITEMS = css_xpath('div.data-file-item, tr.file-row')
+_FILE_NAME = css_xpath('span.filename::text')
+_FILE_FIELD_XPS = {
+    'size': css_xpath('span.filesize::text'),
+    'format': css_xpath('span.format::text'),
+    'description': css_xpath('div.description::text'),
+}
+_FILE_DOWNLOAD_URL = css_xpath('a.download::attr(href)')
+
+# Publications
+_PUB_ITEMS = css_xpath('div.publication-item, li.publication')
+_PUB_TITLE = css_xpath('h4.pub-title::text')
+_PUB_FIELD_XPS = {
+    'authors': css_xpath('div.pub-authors::text'),
+    'journal': css_xpath('span.pub-journal::text'),
+    'year': css_xpath('span.pub-year::text'),
+    'pmid': css_xpath('span.pmid::text'),
+    'doi': css_xpath('a.doi::attr(href)'),
+}
 
 
 class NsrrSpider(BaseSpider):
@@ -37,7 +97,19 @@ class NsrrSpider(BaseSpider):
     
     custom_settings = {
         **BaseSpider.custom_settings,
-        'DOWNLOAD_DELAY': 2,
+        # Multiplex detail page fetches over one HTTP/2 TLS connection
+        'DOWNLOAD_HANDLERS': {
+            'https': 'scrapy.core.downloader.handlers.http2.H2DownloadHandler',
+        },
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 4,  # Streams share one connection
+        # AutoThrottle paces requests from server latency instead of a fixed delay
+        'DOWNLOAD_DELAY': 0,
+        'AUTOTHROTTLE_ENABLED': True,
+        'AUTOTHROTTLE_START_DELAY': 2,
+        'AUTOTHROTTLE_MAX_DELAY': 30,
+        'AUTOTHROTTLE_TARGET_CONCURRENCY': 2.0,
+        # Skip detail pages already scraped by a previous run
+        'DUPEFILTER_CLASS': 'common.dupefilter.BloomDupeFilter',
     }
     
     def __init__(self, *args, **kwargs):
@@ -50,6 +122,10 @@ class NsrrSpider(BaseSpider):
         }
         
         super().__init__(platform_config=platform_config, *args, **kwargs)
+        
+        # Detail URLs already scheduled in this run; pages repeat the same
+        # links, and skipping them here avoids building duplicate Requests
+        self._scheduled_urls = set()
     
     def parse_list_page(self, response: Response) -> Iterator[Request]:
         """
@@ -63,19 +139,24 @@ class NsrrSpider(BaseSpider):
         """
         self.logger.info(f"Parsing list page: {response.url}")
         
+        root = self.parse_html(response)
+        join = self.url_joiner(response, root)
+        
         # Extract dataset links
         # Note: Actual selectors need to be verified once site is accessible
-        dataset_links = response.css('div.dataset-item a::attr(href), '
-                                    'table.datasets tr td a::attr(href)').getall()
+        dataset_links = _DATASET_LINKS(root)
         
         if not dataset_links:
             # Try alternative selectors
-            dataset_links = response.css('a[href*="/datasets/"]::attr(href)').getall()
+            dataset_links = _DATASET_LINKS_FALLBACK(root)
         
         self.logger.info(f"Found {len(dataset_links)} dataset links")
         
         for link in dataset_links:
-            dataset_url = response.urljoin(link)
+            dataset_url = join(link)
+            if dataset_url in self._scheduled_urls:
+                continue
+            self._scheduled_urls.add(dataset_url)
             
             yield scrapy.Request(
                 url=dataset_url,
@@ -87,11 +168,10 @@ class NsrrSpider(BaseSpider):
             self.stats['pages_scraped'] += 1
         
         # Handle pagination
-        next_page = response.css('a.next-page::attr(href), '
-                                'a[rel="next"]::attr(href)').get()
+        next_page = _NEXT_PAGE(root)
         if next_page:
             yield scrapy.Request(
-                url=response.urljoin(next_page),
+                url=join(next_page[0]),
                 callback=self.parse_list_page,
                 errback=self.handle_error
             )
@@ -109,111 +189,110 @@ class NsrrSpider(BaseSpider):
         self.logger.info(f"Parsing detail page: {response.url}")
         
         # Extract common metadata
-        item = self.extract_common_metadata(response)
+        root = self.parse_html(response)
+        item = self.extract_common_metadata(response, root=root)
+        text = self.clean_texts(_collect_detail_fields(root))
         
         # Extract dataset-specific fields
         # Note: Actual selectors need to be verified once site is accessible
         item.update({
             # Basic information
-            'dataset_name': self.clean_text(response.css('h1.dataset-title::text').get()),
-            'dataset_id': self.clean_text(response.css('span.dataset-id::text').get()),
-            'acronym': self.clean_text(response.css('span.acronym::text').get()),
+            'dataset_name': text['dataset_name'],
+            'dataset_id': text['dataset_id'],
+            'acronym': text['acronym'],
             
             # Description
-            'description': self.clean_text(
-                ' '.join(response.css('div.description *::text').getall())
-            ),
-            'objectives': self.clean_text(
-                ' '.join(response.css('div.objectives *::text').getall())
-            ),
+            'description': self.clean_text(_DESCRIPTION_TEXT(root)),
+            'objectives': self.clean_text(_OBJECTIVES_TEXT(root)),
             
             # Study information
-            'study_type': self.clean_text(response.css('span.study-type::text').get()),
-            'study_design': self.clean_text(response.css('div.study-design::text').get()),
+            'study_type': text['study_type'],
+            'study_design': text['study_design'],
             
             # Participants
-            'participant_count': self.clean_text(response.css('span.participants::text').get()),
-            'age_range': self.clean_text(response.css('span.age-range::text').get()),
-            'gender_distribution': self.clean_text(response.css('span.gender::text').get()),
+            'participant_count': text['participant_count'],
+            'age_range': text['age_range'],
+            'gender_distribution': text['gender_distribution'],
             
             # Data collection
             'collection_period': {
-                'start': self.clean_text(response.css('span.collection-start::text').get()),
-                'end': self.clean_text(response.css('span.collection-end::text').get()),
+                'start': text['collection_start'],
+                'end': text['collection_end'],
             },
-            'data_collection_methods': response.css('div.methods li::text').getall(),
+            'data_collection_methods': _COLLECTION_METHODS(root),
             
             # Sleep-specific data
-            'sleep_measures': response.css('div.sleep-measures li::text').getall(),
-            'polysomnography': self.clean_text(
-                response.css('div.polysomnography::text').get()
-            ),
+            'sleep_measures': _SLEEP_MEASURES(root),
+            'polysomnography': text['polysomnography'],
             
             # Available data
-            'data_files': self._extract_data_files(response),
-            'data_formats': response.css('div.data-formats span::text').getall(),
+            'data_files': self._extract_data_files(root),
+            'data_formats': _DATA_FORMATS(root),
             
             # Access information
-            'access_type': self.clean_text(response.css('span.access-type::text').get()),
-            'data_use_agreement': self.clean_text(
-                response.css('div.data-use-agreement::text').get()
-            ),
+            'access_type': text['access_type'],
+            'data_use_agreement': text['data_use_agreement'],
             
             # Principal investigator
-            'principal_investigator': self.clean_text(response.css('span.pi-name::text').get()),
-            'institution': self.clean_text(response.css('span.institution::text').get()),
+            'principal_investigator': text['principal_investigator'],
+            'institution': text['institution'],
             
             # Funding
-            'funding_source': self.clean_text(response.css('span.funding::text').get()),
-            'grant_number': self.clean_text(response.css('span.grant::text').get()),
+            'funding_source': text['funding_source'],
+            'grant_number': text['grant_number'],
             
             # Publications
-            'publications': self._extract_publications(response),
+            'publications': self._extract_publications(root),
             
             # Contact
-            'contact_email': self.clean_text(
-                response.css('a.contact-email::attr(href)').get()
-            ),
+            'contact_email': text['contact_email'],
         })
         
         self.stats['items_extracted'] += 1
         
         return item
     
-    def _extract_data_files(self, response: Response) -> list:
+    def _extract_data_files(self, root) -> list:
         """Extract data file information."""
+        file_items = _FILE_ITEMS(root)
+        if not file_items:
+            return []
+        
         files = []
         
-        for file_item in response.css('div.data-file-item, tr.file-row'):
-            file_info = {
-                'filename': self.clean_text(file_item.css('span.filename::text').get()),
-                'size': self.clean_text(file_item.css('span.filesize::text').get()),
-                'format': self.clean_text(file_item.css('span.format::text').get()),
-                'description': self.clean_text(file_item.css('div.description::text').get()),
-                'download_url': file_item.css('a.download::attr(href)').get(),
-            }
+        for file_item in file_items:
+            # Entries without a filename are dropped; check it before the other fields
+            filename = self._txt(file_item, _FILE_NAME)
+            if not filename:
+                continue
             
-            if file_info['filename']:
-                files.append(file_info)
+            download_url = _FILE_DOWNLOAD_URL(file_item)
+            files.append({
+                'filename': filename,
+                **{field: self._txt(file_item, xpath) for field, xpath in _FILE_FIELD_XPS.items()},
+                'download_url': download_url[0] if download_url else None,
+            })
         
         return files
     
-    def _extract_publications(self, response: Response) -> list:
+    def _extract_publications(self, root) -> list:
         """Extract publication information."""
+        pubs = _PUB_ITEMS(root)
+        if not pubs:
+            return []
+        
         publications = []
         
-        for pub in response.css('div.publication-item, li.publication'):
-            publication = {
-                'title': self.clean_text(pub.css('h4.pub-title::text').get()),
-                'authors': self.clean_text(pub.css('div.pub-authors::text').get()),
-                'journal': self.clean_text(pub.css('span.pub-journal::text').get()),
-                'year': self.clean_text(pub.css('span.pub-year::text').get()),
-                'pmid': self.clean_text(pub.css('span.pmid::text').get()),
-                'doi': self.clean_text(pub.css('a.doi::attr(href)').get()),
-            }
-            
-            if publication['title']:
-                publications.append(publication)
+        for pub in pubs:
+            # Entries without a title are dropped; check it before the other fields
+            title = self._txt(pub, _PUB_TITLE)
+            if not title:
+                continue
+            
+            publications.append({
+                'title': title,
+                **{field: self._txt(pub, xpath) for field, xpath in _PUB_FIELD_XPS.items()},
+            })
         
         return publications
 
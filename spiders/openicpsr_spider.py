@@ -8,15 +8,212 @@ This serves as another example implementation showing authentication handling.
 """
 
 import scrapy
-from typing import Iterator, Dict, Any
+from dataclasses import dataclass, field
+from typing import Iterator, Dict, Any, Optional
 from scrapy.http import Response, Request
 import sys
 from pathlib import Path
 import json
+import re
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+from collections import Counter, OrderedDict, defaultdict
+from hashlib import blake2b
+from twisted.internet.threads import deferToThread
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from common.base_spider import BaseSpider
+from common.base_spider import BaseSpider, css_xpath, css_text, first_match, field_collector
+
+
+# Precompiled selectors, evaluated directly on lxml elements
+_LOGOUT_LINK = css_xpath('a.logout-link')
+_USER_MENU = css_xpath('div.user-menu')
+_PROJECT_LINKS = css_xpath('div.search-result h3 a::attr(href)')
+_PROJECT_LINKS_FALLBACK = css_xpath('a.project-link::attr(href)')
+_NEXT_PAGE = css_xpath('a.next-page::attr(href)')
+
+# Projects already scraped, one project key per line; skipped on restart
+_CHECKPOINT_PATH = Path('data/cache/openicpsr_checkpoint.txt')
+_PROJECT_ID_IN_URL = re.compile(r'/project/(\d+)')
+
+
+# Bare DOI inside a DOI field ("DOI: 10.3886/E100001V1", "https://doi.org/10...")
+_DOI = re.compile(r'10\.\d{4,9}/\S+')
+
+
+def _canonical_url(url: str) -> str:
+    """Drop a project URL's trailing slash and fragment, so link variants of one page compare equal."""
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=parts.path.rstrip('/') or '/', fragment=''))
+
+
+def _project_key(url: str) -> str:
+    """Return the project ID in a project URL, or the URL itself if it has none."""
+    match = _PROJECT_ID_IN_URL.search(url)
+    return match.group(1) if match else url
+
+# Single-value project fields collected in one tree walk: (tag, class) -> (field, source)
+_DETAIL_FIELDS = {
+    ('h1', 'project-title'): ('title', 'text'),
+    ('span', 'project-id'): ('project_id', 'text'),
+    ('span', 'doi'): ('doi', 'text'),
+    ('span', 'time-start'): ('time_start', 'text'),
+    ('span', 'time-end'): ('time_end', 'text'),
+    ('span', 'unit-analysis'): ('unit_of_analysis', 'text'),
+    ('span', 'collection-start'): ('collection_start', 'text'),
+    ('span', 'collection-end'): ('collection_end', 'text'),
+    ('span', 'data-type'): ('data_type', 'text'),
+    ('span', 'access-type'): ('access_type', 'text'),
+    ('span', 'license'): ('license', 'text'),
+    ('span', 'deposit-date'): ('deposit_date', 'text'),
+    ('span', 'publication-date'): ('publication_date', 'text'),
+    ('span', 'last-updated'): ('last_updated', 'text'),
+}
+_collect_detail_fields = field_collector(_DETAIL_FIELDS)
+
+# Text blocks: whole text content of the section, read in one lxml call
+_ABSTRACT_TEXT = css_text('div.abstract')
+_METHODOLOGY_TEXT = css_text('div.methodology')
+_RESTRICTIONS_TEXT = css_text('div.restrictions')
+
+# List-valued project fields
+_SUBJECT_TERMS = css_xpath('div.subject-terms span::text')
+_KEYWORDS = css_xpath('div.keywords span::text')
+_GEO_COVERAGE = css_xpath('div.geo-coverage span::text')
+_DATA_FORMATS = css_xpath('div.data-format span::text')
+_RELATED_DATASETS = css_xpath('div.related-datasets a::attr(href)')
+_FUNDING_AGENCIES = css_xpath('div.funding span.agency::text')
+_GRANT_NUMBERS = css_xpath('div.funding span.grant::text')
+
+# Repeated entries (authors, files, publications): container selector plus
+# a (tag, class) -> (field, source) table read in one walk over each container
+_AUTHOR_ITEMS = css_xpath('div.author-item')
+_AUTHOR_FIELDS = {
+    ('span', 'author-name'): ('name', 'text'),
+    ('span', 'affiliation'): ('affiliation', 'text'),
+    ('a', 'orcid'): ('orcid', 'href'),
+}
+_collect_author_fields = field_collector(_AUTHOR_FIELDS)
+
+_DATA_FILE_ITEMS = css_xpath('div.data-file-item')
+_DATA_FILE_FIELDS = {
+    ('span', 'filename'): ('filename', 'text'),
+    ('span', 'filesize'): ('size', 'text'),
+    ('span', 'format'): ('format', 'text'),
+    ('div', 'description'): ('description', 'text'),
+    ('a', 'download'): ('download_url', 'href'),
+}
+_collect_data_file_fields = field_collector(_DATA_FILE_FIELDS)
+
+_DOC_FILE_ITEMS = css_xpath('div.doc-file-item')
+_DOC_FILE_FIELDS = {
+    ('span', 'filename'): ('filename', 'text'),
+    ('span', 'doc-type'): ('type', 'text'),
+    ('a', 'download'): ('download_url', 'href'),
+}
+_collect_doc_file_fields = field_collector(_DOC_FILE_FIELDS)
+
+_PUB_ITEMS = css_xpath('div.publication-item')
+_PUB_FIELDS = {
+    ('div', 'citation'): ('citation', 'text'),
+    ('a', 'doi'): ('doi', 'href'),
+    ('a', 'pub-url'): ('url', 'href'),
+}
+_collect_pub_fields = field_collector(_PUB_FIELDS)
+
+
+# Near-duplicate detection on title + abstract. 64-bit signatures are split
+# into 16-bit bands: two signatures at most 3 bits apart share at least one
+# band, so only signatures sharing a band need a Hamming distance check.
+_SIMHASH_BITS = 64
+_SIMHASH_BAND_BITS = 16
+_SIMHASH_BAND_MASK = (1 << _SIMHASH_BAND_BITS) - 1
+
+
+def _simhash(text: str) -> int:
+    """Compute the 64-bit SimHash of a text's lowercased whitespace tokens."""
+    weights = [0] * _SIMHASH_BITS
+    
+    for token, count in Counter(text.lower().split()).items():
+        token_hash = int.from_bytes(blake2b(token.encode(), digest_size=8).digest(), 'big')
+        for bit in range(_SIMHASH_BITS):
+            weights[bit] += count if token_hash >> bit & 1 else -count
+    
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def _simhash_bands(signature: int) -> list:
+    """Return the (band index, band value) keys of a signature."""
+    return [
+        (band, signature >> shift & _SIMHASH_BAND_MASK)
+        for band, shift in enumerate(range(0, _SIMHASH_BITS, _SIMHASH_BAND_BITS))
+    ]
+
+
+@dataclass(slots=True)
+class ProjectItem:
+    """
+    OpenICPSR project item.
+    
+    A slotted dataclass rather than a dict: fixed attribute layout and less
+    memory per item. Scrapy exporters and pipelines read it through
+    ItemAdapter.
+    """
+    # Common metadata (BaseSpider.extract_common_metadata)
+    platform: Optional[str] = None
+    source_url: Optional[str] = None
+    scraped_at: Optional[str] = None
+    response_status: Optional[int] = None
+    track_id: Optional[str] = None
+    
+    # Basic information
+    title: str = ''
+    project_id: str = ''
+    doi: str = ''
+    
+    # Abstract and description
+    abstract: str = ''
+    methodology: str = ''
+    
+    # Authors
+    authors: list = field(default_factory=list)
+    
+    # Subject classification
+    subject_terms: list = field(default_factory=list)
+    keywords: list = field(default_factory=list)
+    
+    # Coverage
+    geographic_coverage: list = field(default_factory=list)
+    temporal_coverage: dict = field(default_factory=dict)
+    unit_of_analysis: str = ''
+    
+    # Data information
+    data_collection_dates: dict = field(default_factory=dict)
+    data_type: str = ''
+    data_format: list = field(default_factory=list)
+    
+    # Files
+    data_files: list = field(default_factory=list)
+    documentation_files: list = field(default_factory=list)
+    
+    # Related materials
+    related_publications: list = field(default_factory=list)
+    related_datasets: list = field(default_factory=list)
+    
+    # Access information
+    access_type: str = ''
+    license: str = ''
+    restrictions: str = ''
+    
+    # Funding
+    funding_agency: list = field(default_factory=list)
+    grant_number: list = field(default_factory=list)
+    
+    # Dates
+    deposit_date: str = ''
+    publication_date: str = ''
+    last_updated: str = ''
 
 
 class OpenicpsrSpider(BaseSpider):
@@ -37,9 +234,71 @@ class OpenicpsrSpider(BaseSpider):
     
     custom_settings = {
         **BaseSpider.custom_settings,
-        'DOWNLOAD_DELAY': 2,
+        # Requests from all download slots share one HTTP/2 TLS connection
+        # to the host, so the handshake and session cookies are set up once
+        'DOWNLOAD_HANDLERS': {
+            'https': 'scrapy.core.downloader.handlers.http2.H2DownloadHandler',
+        },
+        'DOWNLOAD_DELAY': 2,  # Per download slot, see detail_slots
+        # Skip detail pages already scraped by a previous run
+        'DUPEFILTER_CLASS': 'common.dupefilter.BloomDupeFilter',
+        # Serialize feeds with orjson, also when run with scrapy crawl/runspider -o
+        'FEED_EXPORTERS': {
+            'json': 'common.pipeline.exporters.OrjsonItemExporter',
+            'jsonlines': 'common.pipeline.exporters.OrjsonLinesItemExporter',
+        },
+    }
+    
+    # Development mode (-s OPENICPSR_DEV_CACHE=1), for tuning the extractors:
+    # detail pages are served from a local HTTP cache for a day, and neither
+    # the checkpoint nor the Bloom dupefilter skips pages scraped before, so
+    # every re-run re-parses the cached pages. Login and search pages are
+    # never cached.
+    dev_cache_settings = {
+        'HTTPCACHE_ENABLED': True,
+        'HTTPCACHE_POLICY': 'scrapy.extensions.httpcache.DummyPolicy',
+        'HTTPCACHE_STORAGE': 'scrapy.extensions.httpcache.FilesystemCacheStorage',
+        'HTTPCACHE_GZIP': True,
+        'HTTPCACHE_EXPIRATION_SECS': 86400,  # 1 day
+        # Errors and denied/expired-session responses are not replayed
+        'HTTPCACHE_IGNORE_HTTP_CODES': [401, 403, 404, 408, 429, 500, 502, 503, 504],
+        'DUPEFILTER_CLASS': 'scrapy.dupefilters.RFPDupeFilter',
     }
     
+    # Detail pages are spread over this many download slots. Each slot keeps
+    # its own DOWNLOAD_DELAY, so up to detail_slots pages are fetched every
+    # delay period instead of one.
+    detail_slots = 4
+    
+    # Projects whose title + abstract SimHash is within this many bits of a
+    # recently emitted project (mirror DOIs, version pages) are dropped;
+    # None disables the check. Projects whose abstract has fewer than
+    # near_duplicate_min_tokens words are never checked: a title alone (or
+    # with a stub abstract) is too little text, and unrelated projects with
+    # similar titles would collide
+    near_duplicate_bits = 3
+    near_duplicate_window = 50_000
+    near_duplicate_min_tokens = 20
+    
+    @classmethod
+    def update_settings(cls, settings):
+        """Apply the spider's settings, plus dev_cache_settings when OPENICPSR_DEV_CACHE is set."""
+        super().update_settings(settings)
+        if settings.getbool('OPENICPSR_DEV_CACHE'):
+            settings.setdict(cls.dev_cache_settings, priority='spider')
+    
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        
+        spider.dev_cache = crawler.settings.getbool('OPENICPSR_DEV_CACHE')
+        if spider.dev_cache:
+            # Re-parse every project; leave the production checkpoint untouched
+            spider._done = set()
+            spider.logger.info("Development mode: HTTP cache on, checkpoint and Bloom skip off")
+        
+        return spider
+    
     def __init__(self, *args, **kwargs):
         # Platform configuration
         platform_config = {
@@ -59,6 +318,34 @@ class OpenicpsrSpider(BaseSpider):
             *args,
             **kwargs
         )
+        
+        # Detail URLs already scheduled in this run; search pages repeat the
+        # same projects, and skipping them here avoids building duplicate Requests
+        self._scheduled_urls = set()
+        
+        # Recently emitted signatures (signature -> URL) and their band index
+        self._signatures = OrderedDict()
+        self._signature_bands = defaultdict(set)
+        self.stats['near_duplicates'] = 0
+        
+        # Resume: projects finished by earlier runs
+        self.dev_cache = False
+        self._done = set()
+        if _CHECKPOINT_PATH.exists():
+            self._done = set(_CHECKPOINT_PATH.read_text(encoding='utf-8').split())
+            self.logger.info(f"Resuming: skipping {len(self._done)} projects already scraped")
+    
+    def after_login(self, response: Response) -> Iterator[Request]:
+        """Start the search after logging in; search pages always come from the network."""
+        for request in super().after_login(response):
+            request.meta['dont_cache'] = True
+            yield request
+    
+    def create_login_request(self) -> Request:
+        """Create the login request, bypassing the HTTP cache so each run gets a fresh session."""
+        request = super().create_login_request()
+        request.meta['dont_cache'] = True
+        return request
     
     def check_login_success(self, response: Response) -> bool:
         """
@@ -71,10 +358,8 @@ class OpenicpsrSpider(BaseSpider):
             True if login successful
         """
         # Check for user menu or logout link
-        return (
-            response.css('a.logout-link').get() is not None or
-            response.css('div.user-menu').get() is not None
-        )
+        root = self.parse_html(response)
+        return bool(_LOGOUT_LINK(root) or _USER_MENU(root))
     
     def parse_list_page(self, response: Response) -> Iterator[Request]:
         """
@@ -88,177 +373,258 @@ class OpenicpsrSpider(BaseSpider):
         """
         self.logger.info(f"Parsing list page: {response.url}")
         
+        root = self.parse_html(response)
+        join = self.url_joiner(response, root)
+        
         # Extract project links from search results
-        project_links = response.css('div.search-result h3 a::attr(href)').getall()
+        project_links = _PROJECT_LINKS(root)
         
         if not project_links:
             # Try alternative selector
-            project_links = response.css('a.project-link::attr(href)').getall()
+            project_links = _PROJECT_LINKS_FALLBACK(root)
         
         self.logger.info(f"Found {len(project_links)} project links")
         
         for link in project_links:
-            project_url = response.urljoin(link)
+            project_url = _canonical_url(join(link))
+            if project_url in self._scheduled_urls or _project_key(project_url) in self._done:
+                continue
+            self._scheduled_urls.add(project_url)
             
             yield scrapy.Request(
                 url=project_url,
                 callback=self.parse_detail_page,
                 errback=self.handle_error,
-                meta={'platform': self.platform_name}
+                meta={
+                    'platform': self.platform_name,
+                    'download_slot': f'{self.name}-{zlib.crc32(project_url.encode()) % self.detail_slots}',
+                }
             )
             
             self.stats['pages_scraped'] += 1
         
         # Handle pagination
-        next_page = response.css('a.next-page::attr(href)').get()
+        next_page = first_match(root, _NEXT_PAGE)
         if next_page:
             yield scrapy.Request(
-                url=response.urljoin(next_page),
+                url=join(next_page),
                 callback=self.parse_list_page,
-                errback=self.handle_error
+                errback=self.handle_error,
+                # New deposits must show up on every run
+                meta={'dont_cache': True},
             )
     
-    def parse_detail_page(self, response: Response) -> Dict[str, Any]:
+    def parse_detail_page(self, response: Response):
         """
         Parse project detail page to extract all information.
         
+        Parsing and extraction run in the reactor thread pool (lxml releases
+        the GIL while parsing), so downloads continue meanwhile.
+        
         Args:
             response: Response from detail page
             
         Returns:
-            Dictionary with extracted data
+            Deferred firing with a list holding the extracted item
         """
         self.logger.info(f"Parsing detail page: {response.url}")
         
-        # Extract common metadata
-        item = self.extract_common_metadata(response)
+        d = deferToThread(self._extract_detail_with_signature, response)
+        d.addCallback(self._on_detail_extracted)
+        return d
+    
+    def _extract_detail_with_signature(self, response: Response) -> tuple:
+        """Extract the item and its title + abstract SimHash (runs in a worker thread)."""
+        item = self._extract_detail(response)
+        
+        if (self.near_duplicate_bits is None
+                or len(item.abstract.split()) < self.near_duplicate_min_tokens):
+            return item, None
+        
+        return item, _simhash(f"{item.title} {item.abstract}")
+    
+    def _on_detail_extracted(self, result: tuple) -> list:
+        """Drop near-duplicates, count the item (in the reactor thread) and hand it to Scrapy."""
+        item, signature = result
+        self._checkpoint(item.source_url)
+        
+        if signature is not None:
+            duplicate_of = self._find_near_duplicate(signature)
+            if duplicate_of is not None:
+                self.stats['near_duplicates'] += 1
+                self.logger.info(f"Skipping near-duplicate of {duplicate_of}: {item.source_url}")
+                return []
+            
+            self._remember_signature(signature, item.source_url)
+        
+        self.stats['items_extracted'] += 1
+        return [item]
+    
+    def _checkpoint(self, url: str):
+        """Record a finished project so later runs skip it (not in development mode)."""
+        if self.dev_cache:
+            return
+        
+        project_key = _project_key(url)
+        self._done.add(project_key)
+        
+        try:
+            _CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with open(_CHECKPOINT_PATH, 'a', encoding='utf-8') as f:
+                f.write(project_key + '\n')
+        except OSError as e:
+            self.logger.error(f"Failed to checkpoint {project_key}: {e}")
+    
+    def _find_near_duplicate(self, signature: int):
+        """Return the URL of a recent project with a near-identical signature, or None."""
+        for key in _simhash_bands(signature):
+            for other in self._signature_bands.get(key, ()):
+                if bin(signature ^ other).count('1') <= self.near_duplicate_bits:
+                    return self._signatures[other]
+        return None
+    
+    def _remember_signature(self, signature: int, url: str):
+        """Index a signature, evicting the oldest once the window is full."""
+        if signature in self._signatures:
+            return
+        
+        self._signatures[signature] = url
+        for key in _simhash_bands(signature):
+            self._signature_bands[key].add(signature)
+        
+        if len(self._signatures) > self.near_duplicate_window:
+            oldest, _ = self._signatures.popitem(last=False)
+            for key in _simhash_bands(oldest):
+                bucket = self._signature_bands[key]
+                bucket.discard(oldest)
+                if not bucket:
+                    del self._signature_bands[key]
+    
+    def _extract_detail(self, response: Response) -> ProjectItem:
+        """
+        Extract all project fields from a detail page (runs in a worker thread).
+        
+        Args:
+            response: Response from detail page
+            
+        Returns:
+            Extracted project item
+        """
+        root = self.parse_html(response)
+        
+        # Single-value fields and text blocks, cleaned together in one pass
+        text = self.clean_texts({
+            **_collect_detail_fields(root),
+            'abstract': _ABSTRACT_TEXT(root),
+            'methodology': _METHODOLOGY_TEXT(root),
+            'restrictions': _RESTRICTIONS_TEXT(root),
+        })
         
-        # Extract project-specific fields
-        item.update({
+        item = ProjectItem(
+            # Common metadata
+            **self.extract_common_metadata(response, root=root),
+            
             # Basic information
-            'title': self.clean_text(response.css('h1.project-title::text').get()),
-            'project_id': self.clean_text(response.css('span.project-id::text').get()),
-            'doi': self.clean_text(response.css('span.doi::text').get()),
+            title=text['title'],
+            project_id=text['project_id'],
+            doi=self._bare_doi(text['doi']),
             
             # Abstract and description
-            'abstract': self.clean_text(
-                ' '.join(response.css('div.abstract *::text').getall())
-            ),
-            'methodology': self.clean_text(
-                ' '.join(response.css('div.methodology *::text').getall())
-            ),
+            abstract=text['abstract'],
+            methodology=text['methodology'],
             
             # Authors
-            'authors': self._extract_authors(response),
+            authors=self._extract_authors(root),
             
             # Subject classification
-            'subject_terms': response.css('div.subject-terms span::text').getall(),
-            'keywords': response.css('div.keywords span::text').getall(),
+            subject_terms=_SUBJECT_TERMS(root),
+            keywords=_KEYWORDS(root),
             
             # Coverage
-            'geographic_coverage': response.css('div.geo-coverage span::text').getall(),
-            'temporal_coverage': {
-                'start': self.clean_text(response.css('span.time-start::text').get()),
-                'end': self.clean_text(response.css('span.time-end::text').get()),
+            geographic_coverage=_GEO_COVERAGE(root),
+            temporal_coverage={
+                'start': text['time_start'],
+                'end': text['time_end'],
             },
-            'unit_of_analysis': self.clean_text(
-                response.css('span.unit-analysis::text').get()
-            ),
+            unit_of_analysis=text['unit_of_analysis'],
             
             # Data information
-            'data_collection_dates': {
-                'start': self.clean_text(response.css('span.collection-start::text').get()),
-                'end': self.clean_text(response.css('span.collection-end::text').get()),
+            data_collection_dates={
+                'start': text['collection_start'],
+                'end': text['collection_end'],
             },
-            'data_type': self.clean_text(response.css('span.data-type::text').get()),
-            'data_format': response.css('div.data-format span::text').getall(),
+            data_type=text['data_type'],
+            data_format=_DATA_FORMATS(root),
             
             # Files
-            'data_files': self._extract_data_files(response),
-            'documentation_files': self._extract_documentation_files(response),
+            data_files=self._extract_data_files(root),
+            documentation_files=self._extract_documentation_files(root),
             
             # Related materials
-            'related_publications': self._extract_publications(response),
-            'related_datasets': response.css('div.related-datasets a::attr(href)').getall(),
+            related_publications=self._extract_publications(root),
+            related_datasets=_RELATED_DATASETS(root),
             
             # Access information
-            'access_type': self.clean_text(response.css('span.access-type::text').get()),
-            'license': self.clean_text(response.css('span.license::text').get()),
-            'restrictions': self.clean_text(
-                ' '.join(response.css('div.restrictions *::text').getall())
-            ),
+            access_type=text['access_type'],
+            license=text['license'],
+            restrictions=text['restrictions'],
             
             # Funding
-            'funding_agency': response.css('div.funding span.agency::text').getall(),
-            'grant_number': response.css('div.funding span.grant::text').getall(),
+            funding_agency=_FUNDING_AGENCIES(root),
+            grant_number=_GRANT_NUMBERS(root),
             
             # Dates
-            'deposit_date': self.clean_text(response.css('span.deposit-date::text').get()),
-            'publication_date': self.clean_text(
-                response.css('span.publication-date::text').get()
-            ),
-            'last_updated': self.clean_text(response.css('span.last-updated::text').get()),
-        })
-        
-        self.stats['items_extracted'] += 1
+            deposit_date=text['deposit_date'],
+            publication_date=text['publication_date'],
+            last_updated=text['last_updated'],
+        )
         
         return item
     
-    def _extract_authors(self, response: Response) -> list:
+    def _bare_doi(self, text: str) -> str:
+        """Return the DOI within a cleaned DOI field, or the field unchanged if it holds none."""
+        match = _DOI.search(text)
+        return match.group() if match else text
+    
+    def _extract_authors(self, root) -> list:
         """Extract author information."""
         authors = []
         
-        for author in response.css('div.author-item'):
-            author_info = {
-                'name': self.clean_text(author.css('span.author-name::text').get()),
-                'affiliation': self.clean_text(author.css('span.affiliation::text').get()),
-                'orcid': self.clean_text(author.css('a.orcid::attr(href)').get()),
-            }
-            authors.append(author_info)
+        for author in _AUTHOR_ITEMS(root):
+            authors.append(self.clean_texts(_collect_author_fields(author)))
         
         return authors
     
-    def _extract_data_files(self, response: Response) -> list:
+    def _extract_data_files(self, root) -> list:
         """Extract data file information."""
         files = []
         
-        for file_item in response.css('div.data-file-item'):
-            file_info = {
-                'filename': self.clean_text(file_item.css('span.filename::text').get()),
-                'size': self.clean_text(file_item.css('span.filesize::text').get()),
-                'format': self.clean_text(file_item.css('span.format::text').get()),
-                'description': self.clean_text(file_item.css('div.description::text').get()),
-                'download_url': file_item.css('a.download::attr(href)').get(),
-            }
+        for file_item in _DATA_FILE_ITEMS(root):
+            values = _collect_data_file_fields(file_item)
+            file_info = self.clean_texts(values)
+            file_info['download_url'] = values['download_url']
             files.append(file_info)
         
         return files
     
-    def _extract_documentation_files(self, response: Response) -> list:
+    def _extract_documentation_files(self, root) -> list:
         """Extract documentation file information."""
         docs = []
         
-        for doc_item in response.css('div.doc-file-item'):
-            doc_info = {
-                'filename': self.clean_text(doc_item.css('span.filename::text').get()),
-                'type': self.clean_text(doc_item.css('span.doc-type::text').get()),
-                'download_url': doc_item.css('a.download::attr(href)').get(),
-            }
+        for doc_item in _DOC_FILE_ITEMS(root):
+            values = _collect_doc_file_fields(doc_item)
+            doc_info = self.clean_texts(values)
+            doc_info['download_url'] = values['download_url']
             docs.append(doc_info)
         
         return docs
     
-    def _extract_publications(self, response: Response) -> list:
+    def _extract_publications(self, root) -> list:
         """Extract related publication information."""
         publications = []
         
-        for pub in response.css('div.publication-item'):
-            publication = {
-                'citation': self.clean_text(pub.css('div.citation::text').get()),
-                'doi': self.clean_text(pub.css('a.doi::attr(href)').get()),
-                'url': self.clean_text(pub.css('a.pub-url::attr(href)').get()),
-            }
-            publications.append(publication)
+        for pub in _PUB_ITEMS(root):
+            publications.append(self.clean_texts(_collect_pub_fields(pub)))
         
         return publications
 